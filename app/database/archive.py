@@ -0,0 +1,241 @@
+"""
+Холодный уровень хранения для заявок и отгрузок.
+
+Закрытые месяцы переносятся из горячих таблиц requests/shipments/shipment_items
+в одноименные таблицы схемы archive:
+- в Postgres это схема archive, где requests и shipments секционированы по месяцам
+  (PARTITION BY RANGE (timestamp)), так что выборка за период читает только свои секции;
+- в SQLite это отдельный файл базы (DB_SQLITE_ARCHIVE), который подключается через
+  ATTACH ... AS archive при выдаче соединения из пула, как только файл существует.
+
+Граница уровней хранится в archive_state: записи старше archived_before читаются
+из архива, остальные — из горячей таблицы. Перенос выполняет
+`python -m app.database.maintenance archive`.
+"""
+import os
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Float, Index, Integer, String, select, delete, event, make_url, text, func
+from sqlalchemy.ext.asyncio import AsyncAttrs
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+
+from app.database.models import DB_URL, IS_SQLITE, engine, read_engine, replica_engine, dialect_insert
+from app.database.models import Request, Shipment, ShipmentItem, ShipmentLines, ArchiveState
+
+ARCHIVE_SCHEMA = 'archive'
+
+
+class ArchiveBase(AsyncAttrs, DeclarativeBase):
+    """Таблицы холодного уровня; не входят в Base.metadata и создаются только командой archive"""
+    pass
+
+
+# Колонки повторяют горячие таблицы, но без внешних ключей: архив не зависит
+# от удаления точек и пользователей. В Postgres ключ секции входит в первичный ключ.
+class ArchivedRequest(ArchiveBase):
+    __tablename__ = 'requests'
+    __table_args__ = (
+        Index('ix_archive_requests_point_id_timestamp', 'point_id', 'timestamp'),
+        {'schema': ARCHIVE_SCHEMA, 'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+    request_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    point_id: Mapped[int] = mapped_column(Integer)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    activity: Mapped[str] = mapped_column(String(50))
+    pet_bag: Mapped[int] = mapped_column(Integer, nullable=True)
+    aluminum_bag: Mapped[int] = mapped_column(Integer, nullable=True)
+    glass_bag: Mapped[int] = mapped_column(Integer, nullable=True)
+    other: Mapped[int] = mapped_column(Integer, nullable=True)
+
+
+class ArchivedShipment(ShipmentLines, ArchiveBase):
+    __tablename__ = 'shipments'
+    __table_args__ = (
+        Index('ix_archive_shipments_point_id_timestamp', 'point_id', 'timestamp'),
+        {'schema': ARCHIVE_SCHEMA, 'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+    shipment_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    point_id: Mapped[int] = mapped_column(Integer)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    total_pay: Mapped[float] = mapped_column(Float, default=0.0)
+
+    items: Mapped[list["ArchivedShipmentItem"]] = relationship(
+        "ArchivedShipmentItem",
+        primaryjoin="ArchivedShipment.shipment_id == foreign(ArchivedShipmentItem.shipment_id)",
+        lazy='selectin', viewonly=True)
+
+
+class ArchivedShipmentItem(ArchiveBase):
+    __tablename__ = 'shipment_items'
+    __table_args__ = {'schema': ARCHIVE_SCHEMA}
+
+    shipment_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    material: Mapped[str] = mapped_column(String(30), primary_key=True)
+    kg: Mapped[float] = mapped_column(Float, default=0.0)
+    price_per_kg: Mapped[float] = mapped_column(Float, default=0.0)
+    total: Mapped[float] = mapped_column(Float, default=0.0)
+
+
+# Горячая таблица -> архивная
+ARCHIVED = {
+    Request: ArchivedRequest,
+    Shipment: ArchivedShipment,
+}
+
+
+# --- SQLite: файл архива ---
+
+def sqlite_archive_path():
+    """Путь к файлу архива: DB_SQLITE_ARCHIVE или <база>_archive<расширение> рядом с основной"""
+    path = os.getenv('DB_SQLITE_ARCHIVE')
+    if path:
+        return path
+    root, ext = os.path.splitext(make_url(DB_URL).database)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def _attach_archive(read_only):
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get('archive') or not os.path.exists(sqlite_archive_path()):
+            return
+        path = sqlite_archive_path()
+        cursor = dbapi_connection.cursor()
+        cursor.execute(
+            "ATTACH DATABASE ? AS archive",
+            (f"file:{path}?mode=ro" if read_only else path,))
+        cursor.close()
+        connection_record.info['archive'] = True
+    return on_checkout
+
+
+if IS_SQLITE and make_url(DB_URL).database not in (None, '', ':memory:'):
+    event.listen(engine.sync_engine, 'checkout', _attach_archive(read_only=False))
+    if read_engine is not engine:
+        event.listen(read_engine.sync_engine, 'checkout', _attach_archive(read_only=True))
+
+# Копия SQLite для отчетов читает тот же файл архива (только чтение)
+if replica_engine is not None and IS_SQLITE and replica_engine.dialect.name == 'sqlite':
+    event.listen(replica_engine.sync_engine, 'checkout', _attach_archive(read_only=True))
+
+
+# --- Чтение ---
+
+async def archive_boundary(session, model):
+    """Граница уровней для горячей модели или None, если архива по ней нет"""
+    return await session.scalar(
+        select(ArchiveState.archived_before)
+        .where(ArchiveState.table_name == model.__tablename__))
+
+
+# --- Перенос в архив ---
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def previous_month(month):
+    return datetime(month.year - (month.month == 1), (month.month - 2) % 12 + 1, 1)
+
+
+async def prepare_archive():
+    """Создает хранилище архива: файл в SQLite или схему в Postgres, и таблицы в нем"""
+    if IS_SQLITE:
+        # Пустой файл — корректная пустая база; соединения подключат его при следующей выдаче из пула
+        open(sqlite_archive_path(), 'ab').close()
+    async with engine.begin() as conn:
+        if not IS_SQLITE:
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        await conn.run_sync(ArchiveBase.metadata.create_all)
+
+
+async def _create_partitions(conn, month):
+    """Секции месяца в Postgres (в SQLite секций нет)"""
+    if IS_SQLITE:
+        return
+    for archived in ARCHIVED.values():
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{archived.__tablename__}_{month:%Y_%m} "
+            f"PARTITION OF {ARCHIVE_SCHEMA}.{archived.__tablename__} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')"))
+
+
+def _copy(archived, hot_table, where):
+    """INSERT ... SELECT из горячей таблицы в архивную; повторный перенос ничего не дублирует"""
+    columns = [column.name for column in archived.__table__.columns]
+    query = select(*(hot_table.c[name] for name in columns))
+    return (dialect_insert(archived)
+            .from_select(columns, query.where(where))
+            .on_conflict_do_nothing())
+
+
+async def archive_month(month):
+    """
+    Переносит месяц заявок и отгрузок в архив.
+    Порядок шагов делает перенос безопасным для повторного запуска и для читателей:
+    копия (коммит) -> сдвиг границы (коммит) -> удаление из горячих таблиц (коммит).
+    В SQLite архив — другой файл, и общий коммит для двух файлов в WAL не атомарен.
+    """
+    start, end = month, next_month(month)
+    requests, shipments, items = Request.__table__, Shipment.__table__, ShipmentItem.__table__
+    in_requests = (requests.c.timestamp >= start) & (requests.c.timestamp < end)
+    in_shipments = (shipments.c.timestamp >= start) & (shipments.c.timestamp < end)
+    month_shipments = select(shipments.c.shipment_id).where(in_shipments)
+
+    async with engine.begin() as conn:
+        await _create_partitions(conn, month)
+        await conn.execute(_copy(ArchivedRequest, requests, in_requests))
+        await conn.execute(_copy(ArchivedShipment, shipments, in_shipments))
+        await conn.execute(_copy(
+            ArchivedShipmentItem, items,
+            items.c.shipment_id.in_(month_shipments)))
+
+    # Граница только растет: повторный запуск с большим --keep-months не должен
+    # сдвинуть её назад и спрятать уже перенесенные в архив месяцы
+    latest = func.greatest if engine.dialect.name == 'postgresql' else func.max
+    async with engine.begin() as conn:
+        for model in ARCHIVED:
+            stmt = dialect_insert(ArchiveState).values(table_name=model.__tablename__, archived_before=end)
+            await conn.execute(stmt.on_conflict_do_update(
+                index_elements=[ArchiveState.table_name],
+                set_={'archived_before': latest(ArchiveState.archived_before, stmt.excluded.archived_before)}))
+
+    async with engine.begin() as conn:
+        await conn.execute(delete(items).where(items.c.shipment_id.in_(month_shipments)))
+        await conn.execute(delete(shipments).where(in_shipments))
+        await conn.execute(delete(requests).where(in_requests))
+
+
+async def archive_closed_months(keep_months):
+    """
+    Переносит в архив все месяцы старше keep_months последних (текущий месяц
+    не переносится никогда). Возвращает список перенесенных месяцев.
+    """
+    cutoff = month_start(datetime.utcnow())
+    for _ in range(keep_months):
+        cutoff = previous_month(cutoff)
+
+    async with engine.connect() as conn:
+        oldest = min(
+            (moment for moment in [
+                await conn.scalar(select(func.min(model.timestamp)).where(model.timestamp < cutoff))
+                for model in ARCHIVED] if moment is not None),
+            default=None)
+    if oldest is None:
+        return []
+
+    await prepare_archive()
+    months = []
+    month = month_start(oldest)
+    while month < cutoff:
+        await archive_month(month)
+        months.append(month)
+        month = next_month(month)
+    return months
@@ -0,0 +1,94 @@
+"""
+Микробенчмарк горячих выборок одной строки: время на вызов, когда select()
+собирается при каждом вызове (как было раньше), и для заранее собранных
+выражений из app.database.requests.
+
+    python -m app.database.bench [--calls N]
+
+Только читает базу из DB_URL; tg_id и point_id берутся из первой строки users.
+Отдельно печатается стоимость одной сборки выражения без обращения к базе.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.database.models import User, async_session, engine
+from app.database import requests
+
+
+def inline_user_by_tg_id(tg_id):
+    return select(User).where(User.tg_id == tg_id), None
+
+
+def inline_user_by_point_id(point_id):
+    return select(User).where(User.point_id == point_id).options(selectinload(User.point)), None
+
+
+def cached_user_by_tg_id(tg_id):
+    return requests._user_by_tg_id, {'tg_id': tg_id}
+
+
+def cached_user_by_point_id(point_id):
+    return requests._user_with_point_by_point_id, {'point_id': point_id}
+
+
+CASES = (
+    ("user by tg_id", 'tg_id', inline_user_by_tg_id, cached_user_by_tg_id),
+    ("user by point_id", 'point_id', inline_user_by_point_id, cached_user_by_point_id),
+)
+
+
+async def per_call(session, build, value, calls):
+    """Среднее время вызова в микросекундах (после прогрева)"""
+    for _ in range(min(calls, 100)):
+        await session.scalar(*build(value))
+    started = time.perf_counter()
+    for _ in range(calls):
+        stmt, params = build(value)
+        await session.scalar(stmt, params)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def build_cost(build, value, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        build(value)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def run(args):
+    try:
+        async with async_session() as session:
+            user = await session.scalar(select(User).where(User.point_id.is_not(None)).limit(1))
+            if user is None:
+                print("bench: no users with a point in the database")
+                return
+            values = {'tg_id': user.tg_id, 'point_id': user.point_id}
+
+            print(f"{'lookup':<20}{'inline, us':>12}{'cached, us':>12}{'build, us':>12}")
+            for title, key, inline, cached in CASES:
+                inline_us = await per_call(session, inline, values[key], args.calls)
+                cached_us = await per_call(session, cached, values[key], args.calls)
+                print(f"{title:<20}{inline_us:>12.1f}{cached_us:>12.1f}"
+                      f"{build_cost(inline, values[key], args.calls):>12.1f}")
+
+        # Точка берется из справочника в памяти, без SQL
+        started = time.perf_counter()
+        for _ in range(args.calls):
+            await requests.get_point_by_id(values['point_id'])
+        print(f"{'point by id':<20}{'':>12}{(time.perf_counter() - started) / args.calls * 1e6:>12.1f}")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m app.database.bench')
+    parser.add_argument('--calls', type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
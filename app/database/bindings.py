@@ -0,0 +1,48 @@
+import os
+import time
+from collections import OrderedDict
+
+
+class BindingCache:
+    """
+    Ограниченный LRU-кэш привязок tg_id → point_id с временем жизни записей.
+    Хранит и отсутствие привязки (point_id=None), чтобы незарегистрированные
+    пользователи тоже не ходили в БД. Сама точка берется из справочника.
+    """
+
+    def __init__(self, max_size=10000, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()  # tg_id -> (point_id, expires_at)
+
+    def get(self, tg_id):
+        """Возвращает (найдено, point_id)"""
+        item = self._items.get(tg_id)
+        if item is None:
+            return False, None
+        point_id, expires_at = item
+        if expires_at < time.monotonic():
+            del self._items[tg_id]
+            return False, None
+        self._items.move_to_end(tg_id)
+        return True, point_id
+
+    def put(self, tg_id, point_id):
+        self._items[tg_id] = (point_id, time.monotonic() + self.ttl)
+        self._items.move_to_end(tg_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, tg_id):
+        self._items.pop(tg_id, None)
+
+    def invalidate_point(self, point_id):
+        """Сбрасывает все привязки к точке (удаление точки — редкая операция)"""
+        for tg_id in [tg_id for tg_id, (bound, _) in self._items.items() if bound == point_id]:
+            del self._items[tg_id]
+
+
+bindings = BindingCache(
+    max_size=int(os.getenv('BINDING_CACHE_SIZE', 10000)),
+    ttl=int(os.getenv('BINDING_CACHE_TTL', 3600)),
+)
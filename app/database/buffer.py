@@ -0,0 +1,152 @@
+import asyncio
+import os
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.database.models import async_session
+from app.database.models import Request
+from app.database.stats import set_bags_counts
+
+
+class RequestBuffer:
+    """
+    Буфер отложенной записи для заявок bag_full.
+    Заявки и новые значения Point.bags_count копятся в памяти и сбрасываются
+    одной транзакцией: многострочный INSERT заявок и пакетный UPDATE точек
+    вместе со счетчиками зон.
+    Сброс происходит раз в flush_interval_ms или при накоплении max_items записей.
+    Строки, которые база отвергает (например, заявка для уже удаленной точки),
+    отбрасываются по одной с записью в лог, а не блокируют очередь. При других
+    ошибках (база недоступна, database is locked) записи остаются в очереди и
+    повторяются с экспоненциальной паузой до max_backoff_ms; память ограничена max_queue.
+    """
+
+    def __init__(self, flush_interval_ms=200, max_items=100, max_backoff_ms=30000, max_queue=10000):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_items = max_items
+        self.max_backoff = max_backoff_ms / 1000
+        self.max_queue = max_queue
+        self._failures = 0
+        self._requests = []
+        self._bags = {}  # point_id -> bags_count, последнее значение побеждает
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    def add(self, point_id, user_id, activity, bags_count=None,
+            pet_bag=None, aluminum_bag=None, glass_bag=None, other=None):
+        """Ставит заявку (и при необходимости новое число мешков точки) в очередь записи"""
+        self._requests.append({
+            'timestamp': datetime.utcnow(),  # время нажатия, а не сброса буфера
+            'point_id': point_id,
+            'user_id': user_id,
+            'activity': activity,
+            'pet_bag': pet_bag,
+            'aluminum_bag': aluminum_bag,
+            'glass_bag': glass_bag,
+            'other': other,
+        })
+        if bags_count is not None:
+            self._bags[point_id] = bags_count
+        self._trim()
+        # Во время паузы после ошибки полная очередь не ускоряет повтор
+        if len(self._requests) >= self.max_items and not self._failures:
+            self._full.set()
+
+    def _trim(self):
+        """Ограничивает очередь: при переполнении отбрасываются самые старые заявки"""
+        overflow = len(self._requests) - self.max_queue
+        if overflow > 0:
+            del self._requests[:overflow]
+            print(f"Request buffer is full, dropped {overflow} oldest requests")
+
+    @staticmethod
+    async def _write(requests, bags):
+        async with async_session() as session:
+            if requests:
+                await session.execute(insert(Request), requests)
+            if bags:
+                await set_bags_counts(session, bags)
+            await session.commit()
+
+    def _delay(self):
+        """Пауза до следующего сброса: обычный интервал или экспоненциальная после ошибок"""
+        if not self._failures:
+            return self.flush_interval
+        return min(self.flush_interval * 2 ** self._failures, self.max_backoff)
+
+    async def _write_one_by_one(self, requests, bags):
+        """
+        Пишет пачку по одной строке, отбрасывая строки, которые база отвергает.
+        Записанные строки убираются из requests, так что при другой ошибке
+        повторяется только незаписанный остаток.
+        """
+        while requests:
+            request = requests[0]
+            try:
+                await self._write([request], {})
+            except IntegrityError as e:
+                print(f"Dropped request {request['activity']} for point {request['point_id']}: {e}")
+            del requests[0]
+        # Удаленные точки set_bags_counts пропускает сам
+        await self._write([], bags)
+
+    async def flush(self):
+        """Записывает накопленное одной транзакцией"""
+        async with self._lock:
+            requests, self._requests = self._requests, []
+            bags, self._bags = self._bags, {}
+            if not requests and not bags:
+                return
+
+            try:
+                try:
+                    await self._write(requests, bags)
+                except IntegrityError:
+                    await self._write_one_by_one(requests, bags)
+                self._failures = 0
+            except Exception as e:
+                # Возвращаем записи в начало очереди, чтобы повторить при следующем сбросе
+                self._failures += 1
+                self._requests[:0] = requests
+                self._bags = {**bags, **self._bags}
+                self._trim()
+                print(f"Error flushing request buffer, retrying in {self._delay():.1f}s: {e}")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self._delay())
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает фоновый сброс и дописывает всё, что осталось в буфере"""
+        if self._task is not None:
+            # Не отменяем задачу, чтобы не прервать сброс на середине транзакции
+            self._stopping = True
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._requests or self._bags:
+            print(f"Request buffer stopped with {len(self._requests)} unsaved requests "
+                  f"and {len(self._bags)} bag counts")
+
+
+request_buffer = RequestBuffer(
+    flush_interval_ms=int(os.getenv('REQUEST_FLUSH_INTERVAL_MS', 200)),
+    max_items=int(os.getenv('REQUEST_FLUSH_MAX_ITEMS', 100)),
+    max_backoff_ms=int(os.getenv('REQUEST_FLUSH_MAX_BACKOFF_MS', 30000)),
+    max_queue=int(os.getenv('REQUEST_BUFFER_MAX_QUEUE', 10000)),
+)
@@ -0,0 +1,157 @@
+import asyncio
+from typing import NamedTuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.database.models import async_session
+from app.database.models import Point, Zone, Region
+
+
+class RegionSnapshot(NamedTuple):
+    """Неизменяемый снимок региона"""
+    region_id: int
+
+
+class ZoneSnapshot(NamedTuple):
+    """Неизменяемый снимок зоны"""
+    zone_id: int
+    region_id: int
+
+
+class PointSnapshot(NamedTuple):
+    """Неизменяемый снимок точки: в отличие от ORM-объекта не зависит от сессии"""
+    point_id: int
+    point_name: str
+    point_owner_name: str
+    phone_number: str
+    address: str
+    bags_count: int
+    zone_id: int
+
+
+class Directory:
+    """
+    Кэш справочника регион → зона → точка на весь процесс.
+    Загружается при старте и дает O(1) поиск по id, а также по зоне и региону.
+    Изменения применяются сквозной записью только после коммита транзакции,
+    в которой они сделаны (см. after_commit).
+    """
+
+    def __init__(self):
+        self._regions = {}
+        self._zones = {}
+        self._points = {}
+        self._zones_by_region = {}  # region_id -> {zone_id: ZoneSnapshot}
+        self._points_by_zone = {}  # zone_id -> {point_id: PointSnapshot}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        """Полностью перечитывает справочник из БД"""
+        async with self._lock:
+            async with async_session() as session:
+                regions = await session.execute(
+                    select(*(getattr(Region, f) for f in RegionSnapshot._fields)))
+                zones = await session.execute(
+                    select(*(getattr(Zone, f) for f in ZoneSnapshot._fields)))
+                points = await session.execute(
+                    select(*(getattr(Point, f) for f in PointSnapshot._fields))
+                    .where(Point.deleted_at.is_(None)))
+
+                self._regions = {}
+                self._zones = {}
+                self._points = {}
+                self._zones_by_region = {}
+                self._points_by_zone = {}
+                for row in regions:
+                    self.put_region(RegionSnapshot(*row))
+                for row in zones:
+                    self.put_zone(ZoneSnapshot(*row))
+                for row in points:
+                    self.put_point(PointSnapshot(*row))
+            self._loaded = True
+
+    async def ensure_loaded(self):
+        if not self._loaded:
+            await self.load()
+
+    def invalidate(self):
+        """Помечает справочник устаревшим: он будет перечитан при следующем обращении"""
+        self._loaded = False
+
+    # --- Поиск ---
+
+    def region(self, region_id):
+        return self._regions.get(region_id)
+
+    def zone(self, zone_id):
+        return self._zones.get(zone_id)
+
+    def point(self, point_id):
+        return self._points.get(point_id)
+
+    def regions(self):
+        return list(self._regions.values())
+
+    def zones(self):
+        return list(self._zones.values())
+
+    def points(self):
+        return list(self._points.values())
+
+    def zones_in_region(self, region_id):
+        return list(self._zones_by_region.get(region_id, {}).values())
+
+    def points_in_zone(self, zone_id):
+        return list(self._points_by_zone.get(zone_id, {}).values())
+
+    # --- Сквозная запись ---
+
+    def put_region(self, region):
+        self._regions[region.region_id] = region
+        self._zones_by_region.setdefault(region.region_id, {})
+
+    def put_zone(self, zone):
+        self._zones[zone.zone_id] = zone
+        self._zones_by_region.setdefault(zone.region_id, {})[zone.zone_id] = zone
+        self._points_by_zone.setdefault(zone.zone_id, {})
+
+    def put_point(self, point):
+        old = self._points.get(point.point_id)
+        if old is not None and old.zone_id != point.zone_id:
+            self._points_by_zone.get(old.zone_id, {}).pop(point.point_id, None)
+        self._points[point.point_id] = point
+        self._points_by_zone.setdefault(point.zone_id, {})[point.point_id] = point
+
+    def remove_point(self, point_id):
+        point = self._points.pop(point_id, None)
+        if point is not None:
+            self._points_by_zone.get(point.zone_id, {}).pop(point_id, None)
+
+    def set_bags_count(self, point_id, bags_count):
+        point = self._points.get(point_id)
+        if point is not None:
+            self.put_point(point._replace(bags_count=bags_count))
+
+
+directory = Directory()
+
+
+def after_commit(session, method, *args):
+    """
+    Откладывает изменение кэша до коммита сессии (AsyncSession или Session).
+    При откате транзакции отложенные изменения отбрасываются.
+    """
+    session.info.setdefault('cache_updates', []).append((method, args))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_cache_updates(session):
+    for method, args in session.info.pop('cache_updates', ()):
+        method(*args)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_cache_updates(session):
+    session.info.pop('cache_updates', None)
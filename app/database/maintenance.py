@@ -0,0 +1,61 @@
+"""
+Обслуживание базы из командной строки:
+
+    python -m app.database.maintenance backfill-shipment-daily
+    python -m app.database.maintenance refresh-zone-stats
+    python -m app.database.maintenance archive [--keep-months N]
+"""
+import argparse
+import asyncio
+import os
+
+from app.database.models import engine
+from app.database.migrations import migrate
+from app.database.stats import backfill_shipment_daily, refresh_zone_stats
+from app.database.archive import archive_closed_months
+
+
+async def cmd_backfill_shipment_daily(args):
+    count = await backfill_shipment_daily()
+    print(f"shipment_daily rebuilt: {count} rows")
+
+
+async def cmd_refresh_zone_stats(args):
+    await refresh_zone_stats()
+    print("zone_stats rebuilt")
+
+
+async def cmd_archive(args):
+    months = await archive_closed_months(args.keep_months)
+    if not months:
+        print("archive: nothing to move")
+    for month in months:
+        print(f"archive: moved {month:%Y-%m}")
+
+
+COMMANDS = {
+    'backfill-shipment-daily': cmd_backfill_shipment_daily,
+    'refresh-zone-stats': cmd_refresh_zone_stats,
+    'archive': cmd_archive,
+}
+
+
+async def run(args):
+    try:
+        await migrate()
+        await COMMANDS[args.command](args)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m app.database.maintenance')
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument(
+        '--keep-months', type=int, default=int(os.getenv('ARCHIVE_KEEP_MONTHS', 3)),
+        help="archive: сколько последних закрытых месяцев оставить в горячих таблицах")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Версионные миграции схемы.
+
+Текущая версия хранится одной строкой в schema_version. При старте migrate()
+читает её одним SELECT и, если база уже на последней версии, ничего больше не делает:
+ни create_all, ни рефлексии таблиц. Иначе в одной транзакции применяются только
+недостающие шаги из MIGRATIONS и записывается новая версия.
+
+Новая база создается сразу по текущим моделям (create_all) и помечается последней
+версией, поэтому шаги нужны только для уже существующих баз. Новый шаг добавляется
+в конец MIGRATIONS и не меняется после выкладки.
+"""
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select, delete, insert, text
+from sqlalchemy.exc import DBAPIError
+
+from app.database.models import Base, Point, ZoneStats, engine
+from app.database.stats import fill_zone_stats
+from app.materials import MATERIALS
+
+
+schema_version = Table(
+    'schema_version', MetaData(),
+    Column('version', Integer, nullable=False),
+)
+
+# Ключ pg_advisory_xact_lock: два процесса, стартующих одновременно, не мигрируют базу вдвоем
+MIGRATION_LOCK_ID = 4_201_907
+
+
+# --- Шаги ---
+
+def create_missing_indexes(conn):
+    """
+    create_all не добавляет индексы к уже существующим таблицам,
+    поэтому для старых баз (SQLite и Postgres) создаем недостающие отдельно.
+    Индексы по колонкам, которых в таблице еще нет, создает шаг, добавляющий колонку.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            if {column.name for column in index.columns} <= columns:
+                index.create(conn, checkfirst=True)
+
+
+def migrate_shipment_items(conn):
+    """
+    Переносит материалы из старых колонок shipments.<material>_kg/_price/_total
+    в shipment_items (только ненулевые строки) и удаляет эти колонки.
+    """
+    columns = {column['name'] for column in inspect(conn).get_columns('shipments')}
+    legacy = [material.key for material in MATERIALS if f'{material.key}_kg' in columns]
+    if not legacy:
+        return
+
+    for key in legacy:
+        conn.execute(text(
+            f"INSERT INTO shipment_items (shipment_id, material, kg, price_per_kg, total) "
+            f"SELECT shipment_id, :material, COALESCE({key}_kg, 0), COALESCE({key}_price, 0), COALESCE({key}_total, 0) "
+            f"FROM shipments WHERE COALESCE({key}_kg, 0) <> 0 OR COALESCE({key}_total, 0) <> 0"),
+            {'material': key})
+    for key in legacy:
+        for suffix in ('kg', 'price', 'total'):
+            if f'{key}_{suffix}' in columns:
+                conn.execute(text(f"ALTER TABLE shipments DROP COLUMN {key}_{suffix}"))
+
+
+def baseline(conn):
+    """
+    Приводит базу, созданную до появления миграций, к схеме на момент их введения:
+    недостающие таблицы, строки отгрузок вместо колонок по материалам, индексы.
+    """
+    Base.metadata.create_all(conn)
+    migrate_shipment_items(conn)
+    create_missing_indexes(conn)
+
+
+def add_point_deleted_at(conn):
+    """Колонка мягкого удаления точек points.deleted_at с индексом"""
+    columns = {column['name'] for column in inspect(conn).get_columns('points')}
+    if 'deleted_at' not in columns:
+        column_type = Point.__table__.c.deleted_at.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE points ADD COLUMN deleted_at {column_type}"))
+    for index in Point.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def initial_zone_stats(conn):
+    """Первое заполнение счетчиков zone_stats (раньше пересчитывались при каждом старте)"""
+    conn.execute(delete(ZoneStats))
+    conn.execute(fill_zone_stats())
+
+
+# (версия, шаг); шаг получает синхронное соединение внутри транзакции миграции
+MIGRATIONS = [
+    (1, baseline),
+    (2, add_point_deleted_at),
+    (3, initial_zone_stats),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# --- Применение ---
+
+async def current_version():
+    """Версия схемы или None, если таблицы schema_version еще нет"""
+    try:
+        async with engine.connect() as conn:
+            return await conn.scalar(select(schema_version.c.version))
+    except DBAPIError:
+        return None
+
+
+def _upgrade(conn):
+    if inspect(conn).has_table(schema_version.name):
+        version = conn.scalar(select(schema_version.c.version)) or 0
+    else:
+        schema_version.create(conn)
+        if not inspect(conn).has_table(Point.__tablename__):
+            # Пустая база: создаем всё по текущим моделям, шаги не нужны
+            Base.metadata.create_all(conn)
+            version = LATEST_VERSION
+        else:
+            version = 0
+
+    if version >= LATEST_VERSION and conn.scalar(select(schema_version.c.version)) is not None:
+        return  # Другой процесс успел мигрировать, пока мы ждали блокировку
+
+    for step_version, step in MIGRATIONS:
+        if step_version > version:
+            step(conn)
+            print(f"Schema migrated to version {step_version} ({step.__name__})")
+            version = step_version
+
+    conn.execute(delete(schema_version))
+    conn.execute(insert(schema_version).values(version=version))
+
+
+async def migrate():
+    """Доводит схему до LATEST_VERSION; на актуальной базе — один SELECT"""
+    version = await current_version()
+    if version is not None and version >= LATEST_VERSION:
+        if version > LATEST_VERSION:
+            print(f"Schema version {version} is newer than this code ({LATEST_VERSION})")
+        return
+
+    async with engine.begin() as conn:
+        if engine.dialect.name == 'postgresql':
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': MIGRATION_LOCK_ID})
+        await conn.run_sync(_upgrade)
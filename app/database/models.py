@@ -1,16 +1,199 @@
-from sqlalchemy import ForeignKey, String, BigInteger, Integer, Float, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, relationship
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
-from datetime import datetime
+from sqlalchemy import ForeignKey, String, BigInteger, Integer, Float, Date, DateTime, Index, Select, text, make_url, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase, relationship, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession, async_sessionmaker, create_async_engine
+from contextlib import asynccontextmanager
+from datetime import datetime, date
 
 from dotenv import load_dotenv
+import asyncio
 import os
+import time
 
 load_dotenv()
 
-engine = create_async_engine(url=os.getenv('DB_URL'))
-    
-async_session = async_sessionmaker(engine)
+DB_URL = os.getenv('DB_URL')
+
+
+IS_SQLITE = make_url(DB_URL).get_backend_name() == 'sqlite'
+
+
+def engine_options(url):
+    """
+    Настройки движка и пула соединений из окружения:
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING, DB_POOL_RECYCLE,
+    а для asyncpg также DB_STATEMENT_CACHE_SIZE и DB_STATEMENT_TIMEOUT_MS.
+    """
+    options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),  # секунды
+    }
+
+    if make_url(url).get_backend_name() == 'postgresql':
+        options.update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        )
+        connect_args = {
+            # Кэш подготовленных выражений asyncpg на каждое соединение
+            'prepared_statement_cache_size': int(os.getenv('DB_STATEMENT_CACHE_SIZE', 500)),
+        }
+        statement_timeout = os.getenv('DB_STATEMENT_TIMEOUT_MS')
+        if statement_timeout:
+            connect_args['server_settings'] = {'statement_timeout': statement_timeout}
+        options['connect_args'] = connect_args
+
+    return options
+
+
+# --- SQLite-режим ---
+# Все записи идут через одно соединение-писатель (пул из одного соединения
+# работает как очередь), чтение — через небольшой пул read-only соединений.
+# В WAL читатели не блокируют писателя, поэтому отчеты не мешают записи.
+# Каждый формируемый отчет держит одно соединение читателя на всё время выгрузки,
+# поэтому к DB_SQLITE_READERS добавляется по соединению на каждый из REPORT_WORKERS.
+SQLITE_READERS = int(os.getenv('DB_SQLITE_READERS', 4))
+# Сколько отчетов формируется одновременно (см. app.reports)
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 2))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('DB_SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.getenv('DB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+
+def sqlite_read_only_url(url):
+    """URL того же файла базы, открытого через URI в режиме только для чтения"""
+    url = make_url(url)
+    return url.set(
+        database=f"file:{url.database}",
+        query={**url.query, 'mode': 'ro', 'uri': 'true'})
+
+
+def _sqlite_pragmas(read_only):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        cursor.close()
+    return on_connect
+
+
+def create_sqlite_engines(url):
+    """
+    Движок-писатель с единственным соединением и пул читателей.
+    База в памяти не видна другим соединениям, поэтому там всё идет через писателя.
+    """
+    options = engine_options(url)
+    pool_timeout = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    writer = create_async_engine(
+        url=url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=pool_timeout,
+        **options)
+    event.listen(writer.sync_engine, 'connect', _sqlite_pragmas(read_only=False))
+
+    if make_url(url).database in (None, '', ':memory:'):
+        return writer, writer
+    if SQLITE_READERS < 1:
+        # Без читателей выгрузка отчета заняла бы единственное соединение-писатель
+        raise ValueError(f"DB_SQLITE_READERS must be at least 1, got {SQLITE_READERS}")
+
+    reader = create_async_engine(
+        url=sqlite_read_only_url(url),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=SQLITE_READERS + REPORT_WORKERS,
+        max_overflow=0,
+        pool_timeout=pool_timeout,
+        **options)
+    event.listen(reader.sync_engine, 'connect', _sqlite_pragmas(read_only=True))
+    return writer, reader
+
+
+class RoutingSession(Session):
+    """
+    Сессия SQLite-режима: SELECT уходит в пул читателей, всё остальное
+    (flush, UPDATE/DELETE, DDL, а также SELECT ... FOR UPDATE) — в соединение-писатель.
+    После первой записи сессия до конца работает с писателем, чтобы видеть собственные изменения.
+    """
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (self.info.get('writer') or self._flushing or not isinstance(clause, Select)
+                or clause._for_update_arg is not None):
+            self.info['writer'] = True
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+
+if IS_SQLITE:
+    engine, read_engine = create_sqlite_engines(DB_URL)
+else:
+    engine = read_engine = create_async_engine(url=DB_URL, **engine_options(DB_URL))
+
+# expire_on_commit=False: объекты остаются читаемыми после коммита сессии апдейта
+if read_engine is engine:
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+else:
+    async_session = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=RoutingSession)
+
+
+# --- Реплика для отчетов ---
+# DB_REPLICA_URL — необязательная read-only база (реплика Postgres или копия SQLite),
+# на которую уходят отчеты и выгрузки. Если реплика недоступна или запрос на ней упал,
+# отчеты читают основную базу, а к реплике вернутся не раньше чем через DB_REPLICA_RETRY_S.
+REPLICA_URL = os.getenv('DB_REPLICA_URL')
+REPLICA_RETRY_S = int(os.getenv('DB_REPLICA_RETRY_S', 30))
+
+if REPLICA_URL and make_url(REPLICA_URL).get_backend_name() == 'sqlite':
+    replica_engine = create_async_engine(url=sqlite_read_only_url(REPLICA_URL), **engine_options(REPLICA_URL))
+    event.listen(replica_engine.sync_engine, 'connect', _sqlite_pragmas(read_only=True))
+elif REPLICA_URL:
+    replica_engine = create_async_engine(url=REPLICA_URL, **engine_options(REPLICA_URL))
+else:
+    replica_engine = None
+
+_replica_down_until = 0.0
+
+
+def replica_failed(error):
+    """Отправляет отчеты в основную базу на REPLICA_RETRY_S секунд после ошибки реплики"""
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + REPLICA_RETRY_S
+    print(f"Replica is unavailable, reports use the primary database: {error}")
+
+
+@asynccontextmanager
+async def report_session(primary=False):
+    """
+    Сессия для отчетов и выгрузок: реплика, если она задана и доступна, иначе основная база.
+    primary=True — сразу основная база (повтор запроса, упавшего на реплике).
+    У сессии реплики session.info['replica'] = True.
+    """
+    if not primary and replica_engine is not None and time.monotonic() >= _replica_down_until:
+        try:
+            conn = await replica_engine.connect()
+        except Exception as e:
+            replica_failed(e)
+        else:
+            try:
+                async with AsyncSession(bind=conn, expire_on_commit=False, info={'replica': True}) as session:
+                    yield session
+            finally:
+                await conn.close()
+            return
+
+    async with async_session() as session:
+        yield session
+
+
+def dialect_insert(model):
+    """INSERT с поддержкой ON CONFLICT для диалекта текущей базы (Postgres или SQLite)"""
+    if engine.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -22,7 +205,7 @@ class User(Base):
     __tablename__ = 'users'
     
     tg_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    point_id: Mapped[int] = mapped_column(ForeignKey('points.point_id'), nullable=True)  # Внешний ключ на точку
+    point_id: Mapped[int] = mapped_column(ForeignKey('points.point_id'), nullable=True, index=True)  # Внешний ключ на точку
 
     # Отношение к точке
     point: Mapped["Point"] = relationship("Point", back_populates="users")
@@ -38,7 +221,9 @@ class Point(Base):
     address: Mapped[str] = mapped_column(String(100))
     bags_count: Mapped[int] = mapped_column(Integer)
 
-    zone_id: Mapped[int] = mapped_column(ForeignKey('zones.zone_id'))
+    zone_id: Mapped[int] = mapped_column(ForeignKey('zones.zone_id'), index=True)
+    # Время мягкого удаления: такая точка скрыта от всех поисков и ждет фоновой очистки
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, index=True)
 
     # Отношение к пользователям
     zone: Mapped["Zone"] = relationship("Zone", back_populates="points")
@@ -51,12 +236,23 @@ class Zone(Base):
     __tablename__ = 'zones'
     
     zone_id: Mapped[int] = mapped_column(primary_key=True)
-    region_id: Mapped[int] = mapped_column(ForeignKey('regions.region_id'))
+    region_id: Mapped[int] = mapped_column(ForeignKey('regions.region_id'), index=True)
 
     #Отношение к точке
     points: Mapped[list["Point"]] = relationship("Point", back_populates="zone")
 
 
+class ZoneStats(Base):
+    """
+    Счетчики зоны, которые поддерживаются в той же транзакции, что и изменения точек
+    (см. app.database.stats). Сводка по региону — сумма строк его зон.
+    """
+    __tablename__ = 'zone_stats'
+
+    zone_id: Mapped[int] = mapped_column(ForeignKey('zones.zone_id'), primary_key=True)
+    point_count: Mapped[int] = mapped_column(Integer, default=0)  # Количество точек
+    bags_count: Mapped[int] = mapped_column(Integer, default=0)  # Сумма Point.bags_count по зоне
+
 
 class Region(Base):
     __tablename__ = 'regions'
@@ -68,7 +264,7 @@ class Request(Base):
     __tablename__ = 'requests'
 
     request_id: Mapped[int] = mapped_column(primary_key=True)
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)  # Время записи
+    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)  # Время записи
     point_id: Mapped[int] = mapped_column(ForeignKey('points.point_id'))
     user_id: Mapped[int] = mapped_column(ForeignKey('users.tg_id')) 
     activity: Mapped[str] = mapped_column(String(50))  # Тип активности
@@ -78,69 +274,95 @@ class Request(Base):
     other: Mapped[int] = mapped_column(Integer, nullable=True)  # Количество мешков с другим
 
 
-class Shipment(Base):
+class ShipmentLines:
+    """Доступ к строкам отгрузки по материалу (для горячей и архивной таблиц)"""
+
+    def line(self, material):
+        """(кг, цена за кг, сумма) по материалу; для отсутствующей строки — нули"""
+        for item in self.items:
+            if item.material == material:
+                return item.kg, item.price_per_kg, item.total
+        return 0.0, 0.0, 0.0
+
+
+class Shipment(ShipmentLines, Base):
     __tablename__ = 'shipments'
     
     shipment_id: Mapped[int] = mapped_column(primary_key=True)
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     point_id: Mapped[int] = mapped_column(ForeignKey('points.point_id'))
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.tg_id'))
-    
-    # Основные материалы (категория 1)
-    pet_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    pet_price: Mapped[float] = mapped_column(Float, default=0.0)
-    pet_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    paper_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    paper_price: Mapped[float] = mapped_column(Float, default=0.0)
-    paper_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    alum_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    alum_price: Mapped[float] = mapped_column(Float, default=0.0)
-    alum_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    glass_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    glass_price: Mapped[float] = mapped_column(Float, default=0.0)
-    glass_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    small_beer_box_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    small_beer_box_price: Mapped[float] = mapped_column(Float, default=0.0)
-    small_beer_box_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    large_beer_box_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    large_beer_box_price: Mapped[float] = mapped_column(Float, default=0.0)
-    large_beer_box_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    mixed_beer_box_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    mixed_beer_box_price: Mapped[float] = mapped_column(Float, default=0.0)
-    mixed_beer_box_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    # Другие материалы (категория 2)
-    oil_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    oil_price: Mapped[float] = mapped_column(Float, default=0.0)
-    oil_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    colored_plastic_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    colored_plastic_price: Mapped[float] = mapped_column(Float, default=0.0)
-    colored_plastic_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    iron_kg: Mapped[float] = mapped_column(Float, default=0.0)  # Заменил metal на iron
-    iron_price: Mapped[float] = mapped_column(Float, default=0.0)
-    iron_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    plastic_bag_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    plastic_bag_price: Mapped[float] = mapped_column(Float, default=0.0)
-    plastic_bag_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    mix_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    mix_price: Mapped[float] = mapped_column(Float, default=0.0)
-    mix_total: Mapped[float] = mapped_column(Float, default=0.0)
-    
-    other_kg: Mapped[float] = mapped_column(Float, default=0.0)
-    other_price: Mapped[float] = mapped_column(Float, default=0.0)
-    other_total: Mapped[float] = mapped_column(Float, default=0.0)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.tg_id'), index=True)
     
     total_pay: Mapped[float] = mapped_column(Float, default=0.0)
-async def async_main():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+
+    # Строки по материалам (только ненулевые); загружаются вместе с отгрузкой
+    items: Mapped[list["ShipmentItem"]] = relationship(
+        "ShipmentItem", lazy='selectin', cascade='all, delete-orphan', passive_deletes=True)
+
+
+class ShipmentItem(Base):
+    """Строка отгрузки по одному материалу из реестра app.materials"""
+    __tablename__ = 'shipment_items'
+
+    shipment_id: Mapped[int] = mapped_column(
+        ForeignKey('shipments.shipment_id', ondelete='CASCADE'), primary_key=True)
+    material: Mapped[str] = mapped_column(String(30), primary_key=True)
+    kg: Mapped[float] = mapped_column(Float, default=0.0)
+    price_per_kg: Mapped[float] = mapped_column(Float, default=0.0)
+    total: Mapped[float] = mapped_column(Float, default=0.0)
+
+
+class ShipmentDaily(Base):
+    """
+    Дневная сводка отгрузок по точке и материалу. Обновляется в той же транзакции,
+    что и add_shipment; для старой истории — app.database.maintenance backfill-shipment-daily.
+    point_id без внешнего ключа: сводка переживает удаление точки, как и сами отгрузки.
+    """
+    __tablename__ = 'shipment_daily'
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    point_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    material: Mapped[str] = mapped_column(String(30), primary_key=True)
+    kg: Mapped[float] = mapped_column(Float, default=0.0)
+    revenue: Mapped[float] = mapped_column(Float, default=0.0)
+    shipments: Mapped[int] = mapped_column(Integer, default=0)  # Количество отгрузок с этим материалом
+
+
+class ArchiveState(Base):
+    """
+    Граница холодного уровня по таблице: всё, что старше archived_before,
+    лежит в архиве (app.database.archive), всё остальное — в горячей таблице.
+    """
+    __tablename__ = 'archive_state'
+
+    table_name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    archived_before: Mapped[datetime] = mapped_column(DateTime)
+
+
+# Составные индексы для истории точки (get_requests_page, get_shipments_page и *_by_point);
+# ведущий point_id также покрывает простые выборки по точке
+Index('ix_requests_point_id_timestamp', Request.point_id, Request.timestamp.desc())
+Index('ix_shipments_point_id_timestamp', Shipment.point_id, Shipment.timestamp.desc())
+# Диапазонные отчеты по периоду ведут по дню, первичный ключ — по (day, point_id)
+Index('ix_shipment_daily_point_id_day', ShipmentDaily.point_id, ShipmentDaily.day)
+
+
+async def warm_pool():
+    """
+    Заранее открывает соединения пула, чтобы первые апдейты после деплоя
+    не платили за установку подключения. Количество — DB_POOL_WARM (по умолчанию размер пула).
+    """
+    async def open_connection(target):
+        conn = await target.connect()
+        await conn.execute(text('SELECT 1'))
+        return conn
+
+    targets = [engine] if read_engine is engine else [engine, read_engine]
+    for target in targets:
+        size = target.pool.size() if hasattr(target.pool, 'size') else 0
+        count = min(int(os.getenv('DB_POOL_WARM', size)), size) if size else 0
+
+        connections = await asyncio.gather(*(open_connection(target) for _ in range(count)))
+        # Закрытие возвращает соединения в пул, где они остаются открытыми
+        for conn in connections:
+            await conn.close()
@@ -0,0 +1,66 @@
+import asyncio
+import os
+
+from app.database.requests import get_points_to_purge, purge_deleted_point
+
+
+class PointPurger:
+    """
+    Фоновая очистка мягко удаленных точек.
+    Раз в interval_s секунд берет точки с deleted_at и удаляет их данные
+    короткими транзакциями по batch_size строк (см. purge_deleted_point),
+    так что удаление старой загруженной точки не мешает записи водителей.
+    """
+
+    def __init__(self, interval_s=60, batch_size=500):
+        self.interval = interval_s
+        self.batch_size = batch_size
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    async def purge(self):
+        """Один проход очистки по всем ожидающим точкам"""
+        for point_id in await get_points_to_purge():
+            if self._stopping:
+                return
+            try:
+                await purge_deleted_point(point_id, self.batch_size)
+            except Exception as e:
+                # Точка останется в очереди и будет дочищена на следующем проходе
+                print(f"Error purging point {point_id}: {e}")
+
+    def wakeup(self):
+        """Запускает очередной проход, не дожидаясь интервала"""
+        self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await self.purge()
+            except Exception as e:
+                print(f"Error in point purge: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Останавливает очистку после текущей пачки; недочищенное продолжится после рестарта"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+
+point_purger = PointPurger(
+    interval_s=int(os.getenv('POINT_PURGE_INTERVAL_S', 60)),
+    batch_size=int(os.getenv('POINT_PURGE_BATCH_SIZE', 500)),
+)
@@ -1,28 +1,126 @@
-from app.database.models import async_session
-from app.database.models import User, Point, Zone, Region, Request, Shipment
-from sqlalchemy import select, update, delete, desc, and_
+from app.database.models import async_session, report_session, replica_failed, dialect_insert
+from app.database.models import User, Point, Zone, ZoneStats, Region, Request, Shipment
+from app.database.directory import directory, after_commit, PointSnapshot, ZoneSnapshot, RegionSnapshot
+from app.database.bindings import bindings
+from app.database.models import ShipmentItem, ShipmentDaily, ArchiveState
+from app.database.archive import ARCHIVED, ArchivedShipment, ArchivedShipmentItem, archive_boundary
+from app.materials import MATERIALS, MATERIALS_BY_KEY
+from app.database.stats import adjust_zone_stats, lock_points, set_bags_counts, add_to_shipment_daily
+from sqlalchemy import select, insert, update, delete, desc, or_, func, literal, bindparam, BigInteger
 from sqlalchemy.orm import selectinload
-from datetime import datetime
+from sqlalchemy.exc import DBAPIError
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+from datetime import date, datetime, time
+
+# Размер пачки строк, которую серверный курсор отдает за один запрос при выгрузках
+STREAM_BATCH_SIZE = 1000
+# Записей на странице истории точки
+HISTORY_PAGE_SIZE = 10
+# Строк в одном многострочном INSERT при массовом импорте точек
+IMPORT_BATCH_SIZE = 500
+
+# Горячие выборки одной строки собраны один раз при импорте модуля: при вызове
+# меняются только параметры, поэтому SQL берется из кэша компиляции SQLAlchemy,
+# а в Postgres — из кэша подготовленных выражений asyncpg
+_user_by_tg_id = select(User).where(User.tg_id == bindparam('tg_id'))
+_user_with_point_by_tg_id = _user_by_tg_id.options(selectinload(User.point))
+_user_with_point_by_point_id = (
+    select(User)
+    .where(User.point_id == bindparam('point_id'))
+    .options(selectinload(User.point)))
+_user_point_id = select(User.point_id).where(User.tg_id == bindparam('tg_id'))
+_point_user = select(User.tg_id).where(User.point_id == bindparam('point_id')).limit(1)
+# Учитывает и мягко удаленные точки: их id занят, пока строка не дочищена
+_point_id_taken = select(Point.point_id).where(Point.point_id == bindparam('point_id'))
+
+@asynccontextmanager
+async def session_scope(session=None, commit=False):
+    """
+    Сессия для функций этого модуля.
+    Если передана сессия апдейта (DbSessionMiddleware), работаем в ней и только
+    делаем flush — коммит один на апдейт выполняет middleware.
+    Иначе открываем короткую собственную сессию и при commit=True коммитим её.
+    """
+    if session is not None:
+        yield session
+        if commit:
+            await session.flush()
+        return
 
-async def set_user(tg_id):
-    async with async_session() as session:
-        user = await session.scalar(select(User).where(User.tg_id == tg_id))
-        
-        if not user:
-            session.add(User(tg_id=tg_id))
-            await session.commit()
+    async with async_session() as own_session:
+        yield own_session
+        if commit:
+            await own_session.commit()
 
-async def register_user(tg_id, point_id=None):
-    async with async_session() as session:
-        user = await session.scalar(select(User).where(User.tg_id == tg_id))
-        
-        if not user:
-            session.add(User(tg_id=tg_id, point_id=point_id))
-            await session.commit()
+# tg_id пользователей, которые уже точно есть в базе: повторный /start не ходит в БД
+_known_users = set()
 
-async def add_point(point_id: int, point_name: str, point_owner_name: str, phone_number: str, address: str, bags_count: int, zone_id: int):
-    async with async_session() as session:
-        session.add(Point(
+async def _report_read(read):
+    """
+    Выполняет read(session) для отчета на реплике (report_session). Если запрос на
+    реплике упал (разрыв соединения, отмена на hot standby из-за конфликта с
+    восстановлением), реплика откладывается и запрос один раз повторяется на основной базе.
+    """
+    async with report_session() as session:
+        try:
+            return await read(session)
+        except DBAPIError as e:
+            if not session.info.get('replica'):
+                raise
+            replica_failed(e)
+    async with report_session(primary=True) as session:
+        return await read(session)
+
+async def _report_stream(stream, advance):
+    """
+    Потоковое чтение для выгрузок с тем же повтором, что у _report_read.
+    stream(session, after) отдает строки по порядку, начиная после позиции after;
+    advance(after, строка) — позиция после отданной строки.
+    Если реплика упала посреди чтения, поток один раз продолжается на основной базе
+    с последней отданной строки, без повторов и пропусков.
+    """
+    after = None
+    async with report_session() as session:
+        try:
+            async for row in stream(session, after):
+                yield row
+                after = advance(after, row)
+            return
+        except DBAPIError as e:
+            if not session.info.get('replica'):
+                raise
+            replica_failed(e)
+    async with report_session(primary=True) as session:
+        async for row in stream(session, after):
+            yield row
+
+async def set_user(tg_id, session=None):
+    if tg_id in _known_users:
+        return
+
+    async with session_scope(session, commit=True) as session:
+        await session.execute(
+            dialect_insert(User)
+            .values(tg_id=tg_id)
+            .on_conflict_do_nothing(index_elements=[User.tg_id]))
+    _known_users.add(tg_id)
+
+async def register_user(tg_id, point_id=None, session=None):
+    if tg_id in _known_users:
+        return
+
+    async with session_scope(session, commit=True) as session:
+        await session.execute(
+            dialect_insert(User)
+            .values(tg_id=tg_id, point_id=point_id)
+            .on_conflict_do_nothing(index_elements=[User.tg_id]))
+        after_commit(session, bindings.invalidate, tg_id)
+    _known_users.add(tg_id)
+
+async def add_point(point_id: int, point_name: str, point_owner_name: str, phone_number: str, address: str, bags_count: int, zone_id: int, session=None):
+    async with session_scope(session, commit=True) as session:
+        point = PointSnapshot(
             point_id=int(point_id),  # Явное преобразование в int
             point_name=point_name,
             point_owner_name=point_owner_name,
@@ -30,31 +128,78 @@ async def add_point(point_id: int, point_name: str, point_owner_name: str, phone
             address=address,
             bags_count=bags_count,
             zone_id=int(zone_id)  # Явное преобразование в int
-        ))
-        await session.commit()
+        )
+        session.add(Point(**point._asdict()))
+        await adjust_zone_stats(session, {point.zone_id: (1, bags_count or 0)})
+        after_commit(session, directory.put_point, point)
 
 async def get_zone_by_id(zone_id):
-    async with async_session() as session:
-        zone = await session.scalar(select(Zone).where(Zone.zone_id == zone_id))
-        return zone
+    await directory.ensure_loaded()
+    return directory.zone(int(zone_id))
 
 async def get_region_by_id(region_id):
-    async with async_session() as session:
-        region = await session.scalar(select(Region).where(Region.region_id == region_id))
-        return region
+    await directory.ensure_loaded()
+    return directory.region(int(region_id))
 
-async def add_zone(zone_id, region_id):
-    async with async_session() as session:
+async def add_zone(zone_id, region_id, session=None):
+    async with session_scope(session, commit=True) as session:
         session.add(Zone(zone_id=zone_id, region_id=region_id))
-        await session.commit()
+        session.add(ZoneStats(zone_id=zone_id, point_count=0, bags_count=0))
+        after_commit(session, directory.put_zone, ZoneSnapshot(int(zone_id), int(region_id)))
 
-async def add_region(region_id):
-    async with async_session() as session:
+async def add_region(region_id, session=None):
+    async with session_scope(session, commit=True) as session:
         session.add(Region(region_id=region_id))
-        await session.commit()
+        after_commit(session, directory.put_region, RegionSnapshot(int(region_id)))
 
-async def add_request(point_id, user_id, activity, pet_bag=None, aluminum_bag=None, glass_bag=None, other=None):
-    async with async_session() as session:
+async def add_points_bulk(points, session=None):
+    """
+    Массово создает точки (список PointSnapshot) в одной транзакции:
+    недостающие регионы и зоны — двумя INSERT ... ON CONFLICT DO NOTHING,
+    точки — многострочными INSERT пачками по IMPORT_BATCH_SIZE.
+    Уже существующие точки не трогаются; возвращает (созданные, id уже существующих).
+    """
+    async with session_scope(session, commit=True) as session:
+        existing = set((await session.scalars(
+            select(Point.point_id)
+            .where(Point.point_id.in_([point.point_id for point in points])))).all())
+        points = [point for point in points if point.point_id not in existing]
+        if not points:
+            return [], sorted(existing)
+
+        zones = {point.zone_id: point.zone_id // 100 for point in points}
+        regions = set(zones.values())
+        await session.execute(
+            dialect_insert(Region).on_conflict_do_nothing(),
+            [{'region_id': region_id} for region_id in regions])
+        new_zones = (await session.scalars(
+            dialect_insert(Zone).on_conflict_do_nothing().returning(Zone.zone_id),
+            [{'zone_id': zone_id, 'region_id': region_id} for zone_id, region_id in zones.items()])).all()
+        if new_zones:
+            await session.execute(
+                dialect_insert(ZoneStats).on_conflict_do_nothing(),
+                [{'zone_id': zone_id, 'point_count': 0, 'bags_count': 0} for zone_id in new_zones])
+
+        for start in range(0, len(points), IMPORT_BATCH_SIZE):
+            batch = points[start:start + IMPORT_BATCH_SIZE]
+            await session.execute(insert(Point).values([point._asdict() for point in batch]))
+
+        deltas = {}
+        for point in points:
+            count, bags = deltas.get(point.zone_id, (0, 0))
+            deltas[point.zone_id] = (count + 1, bags + (point.bags_count or 0))
+        await adjust_zone_stats(session, deltas)
+
+        for region_id in regions:
+            after_commit(session, directory.put_region, RegionSnapshot(region_id))
+        for zone_id in new_zones:
+            after_commit(session, directory.put_zone, ZoneSnapshot(zone_id, zones[zone_id]))
+        for point in points:
+            after_commit(session, directory.put_point, point)
+        return points, sorted(existing)
+
+async def add_request(point_id, user_id, activity, pet_bag=None, aluminum_bag=None, glass_bag=None, other=None, session=None):
+    async with session_scope(session, commit=True) as session:
         session.add(Request(
             point_id=point_id,
             user_id=user_id,  # Добавленное поле
@@ -64,388 +209,706 @@ async def add_request(point_id, user_id, activity, pet_bag=None, aluminum_bag=No
             glass_bag=glass_bag,
             other=other
         ))
-        await session.commit()
-        
-async def bind_point_to_user(point_id, tg_id):
-    async with async_session() as session:
-        user = await session.scalar(select(User).where(User.tg_id == tg_id))
         
-        if not user:
-            user = User(tg_id=tg_id)
-            session.add(user)
-            await session.commit()
-
-        point = await session.scalar(select(Point).where(Point.point_id == point_id))
-        if not point:
+async def bind_point_to_user(point_id, tg_id, session=None):
+    """
+    Привязывает точку к пользователю одним выражением:
+    INSERT ... SELECT из points ... ON CONFLICT (tg_id) DO UPDATE.
+    Если точки нет, SELECT не вернет строк и ничего не будет записано.
+    """
+    async with session_scope(session, commit=True) as session:
+        stmt = dialect_insert(User).from_select(
+            ['tg_id', 'point_id'],
+            select(literal(tg_id, BigInteger), Point.point_id)
+            .where(Point.point_id == int(point_id), Point.deleted_at.is_(None)))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.tg_id],
+            set_={'point_id': stmt.excluded.point_id}
+        ).returning(User.tg_id)
+
+        if await session.scalar(stmt) is None:
             raise ValueError(f"Точка с ID {point_id} не найдена.")
+        after_commit(session, bindings.put, tg_id, int(point_id))
+    _known_users.add(tg_id)
 
-        user.point_id = point.point_id
-        await session.commit()
+async def get_user_binding(tg_id, session=None):
+    """
+    Привязка пользователя: (point_id, снимок точки).
+    point_id берется из кэша привязок, точка — из справочника,
+    поэтому для повторных обращений запросов к БД нет.
+    Если привязки нет, возвращает (None, None); если точка не найдена — (point_id, None).
+    """
+    found, point_id = bindings.get(tg_id)
+    if not found:
+        async with session_scope(session) as session:
+            point_id = await session.scalar(_user_point_id, {'tg_id': tg_id})
+        bindings.put(tg_id, point_id)
+
+    if point_id is None:
+        return None, None
+    await directory.ensure_loaded()
+    return point_id, directory.point(point_id)
+
+async def get_user_points(tg_id, session=None):
+    async with session_scope(session) as session:
+        user = await session.scalar(_user_with_point_by_tg_id, {'tg_id': tg_id})
 
-async def get_user_points(tg_id):
-    async with async_session() as session:
-        user = await session.scalar(
-            select(User)
-            .where(User.tg_id == tg_id)
-            .options(selectinload(User.point)))
-        
         if user and user.point:
             return [user.point]
         return []
 
-async def update_bags_count(point_id, bags_count):
-    async with async_session() as session:
-        await session.execute(
-            update(Point)
-            .where(Point.point_id == point_id)
-            .values(bags_count=bags_count))
-        await session.commit()
+async def update_bags_count(point_id, bags_count, session=None):
+    """Новое число мешков точки; счетчики зоны меняются в той же транзакции"""
+    async with session_scope(session, commit=True) as session:
+        await set_bags_counts(session, {int(point_id): bags_count})
 
-async def get_user_by_point_id(point_id: str):
+async def get_user_by_point_id(point_id: str, session=None):
     """Получает пользователя по ID точки с приведением типов"""
-    async with async_session() as session:
+    async with session_scope(session) as session:
         user = await session.scalar(
-            select(User)
-            .where(User.point_id == int(point_id))  # Явное преобразование в int
-            .options(selectinload(User.point))
-        )
+            _user_with_point_by_point_id,
+            {'point_id': int(point_id)})  # Явное преобразование в int
         return user
 
 async def get_zones_by_region(region_id):
-    async with async_session() as session:
-        zones = await session.scalars(select(Zone).where(Zone.region_id == region_id))
-        return zones.all()
+    await directory.ensure_loaded()
+    return directory.zones_in_region(int(region_id))
 
 async def get_points_by_zone(zone_id):
-    async with async_session() as session:
-        points = await session.scalars(select(Point).where(Point.zone_id == zone_id))
-        return points.all()
+    await directory.ensure_loaded()
+    return directory.points_in_zone(int(zone_id))
 
 async def get_point_by_id(point_id):
-    async with async_session() as session:
-        point = await session.scalar(select(Point).where(Point.point_id == int(point_id)))
-        return point
+    """Снимок точки из кэша справочника (без обращения к БД)"""
+    await directory.ensure_loaded()
+    return directory.point(int(point_id))
+
+async def is_point_id_taken(point_id, session=None):
+    """Занят ли ID точки в таблице points, включая мягко удаленные точки"""
+    async with session_scope(session) as session:
+        return await session.scalar(_point_id_taken, {'point_id': int(point_id)}) is not None
 
 async def get_all_points():
-    async with async_session() as session:
-        points = await session.scalars(select(Point))
-        return points.all()
+    await directory.ensure_loaded()
+    return directory.points()
 
 async def get_all_zones():
-    async with async_session() as session:
-        zones = await session.scalars(select(Zone))
-        return zones.all()
+    await directory.ensure_loaded()
+    return directory.zones()
+
+async def get_zones_summary():
+    """Сводка по всем зонам из счетчиков zone_stats: (zone_id, region_id, point_count, bag_sum)"""
+    async def read(session):
+        result = await session.execute(
+            select(
+                Zone.zone_id,
+                Zone.region_id,
+                func.coalesce(ZoneStats.point_count, 0).label('point_count'),
+                func.coalesce(ZoneStats.bags_count, 0).label('bag_sum'))
+            .outerjoin(ZoneStats, ZoneStats.zone_id == Zone.zone_id)
+            .order_by(Zone.zone_id))
+        return result.all()
+    return await _report_read(read)
+
+async def get_regions_rollup(region_id=None):
+    """
+    Сводка регион → зона из счетчиков zone_stats (O(зон), без чтения точек).
+    Возвращает {region_id: [(zone_id, point_count, bag_sum), ...]},
+    для региона без зон список пустой.
+    """
+    async def read(session):
+        stmt = (
+            select(
+                Region.region_id,
+                Zone.zone_id,
+                func.coalesce(ZoneStats.point_count, 0).label('point_count'),
+                func.coalesce(ZoneStats.bags_count, 0).label('bag_sum'))
+            .outerjoin(Zone, Zone.region_id == Region.region_id)
+            .outerjoin(ZoneStats, ZoneStats.zone_id == Zone.zone_id)
+            .order_by(Region.region_id, Zone.zone_id))
+        if region_id is not None:
+            stmt = stmt.where(Region.region_id == region_id)
+        result = await session.execute(stmt)
+
+        rollup = {}
+        for r_id, zone_id, point_count, bag_sum in result:
+            zones = rollup.setdefault(r_id, [])
+            if zone_id is not None:
+                zones.append((zone_id, point_count, bag_sum))
+        return rollup
+    return await _report_read(read)
 
 async def get_all_regions():
-    async with async_session() as session:
-        regions = await session.scalars(select(Region))
-        return regions.all()
+    await directory.ensure_loaded()
+    return directory.regions()
 
-async def get_user_by_tg_id(tg_id):
-    async with async_session() as session:
-        user = await session.scalar(select(User).where(User.tg_id == tg_id))
+async def get_user_by_tg_id(tg_id, session=None):
+    async with session_scope(session) as session:
+        user = await session.scalar(_user_by_tg_id, {'tg_id': tg_id})
         return user
 
-async def is_point_available(point_id):
-    async with async_session() as session:
-        users = await session.scalars(select(User).where(User.point_id == point_id))
-        return not users.first()
+async def is_point_available(point_id, session=None):
+    async with session_scope(session) as session:
+        return await session.scalar(_point_user, {'point_id': int(point_id)}) is None
 
-async def add_shipment(point_id, user_id, **materials):
-    async with async_session() as session:
-        # Удаляем все *_total поля из materials, если они там есть
-        for field in [
-            'alum_total', 'pet_total', 'glass_total', 'paper_total', 
-            'iron_total', 'oil_total', 'other_total',
-            'small_beer_box_total', 'large_beer_box_total', 'mixed_beer_box_total',
-            'colored_plastic_total', 'plastic_bag_total', 'mix_total',
-            'total_pay'
-        ]:
-            materials.pop(field, None)
-        
-        # Расчет всех total значений
-        totals = {
-            'alum': materials.get('alum_kg', 0.0) * materials.get('alum_price', 0.0),
-            'pet': materials.get('pet_kg', 0.0) * materials.get('pet_price', 0.0),
-            'glass': materials.get('glass_kg', 0.0) * materials.get('glass_price', 0.0),
-            'paper': materials.get('paper_kg', 0.0) * materials.get('paper_price', 0.0),
-            'iron': materials.get('iron_kg', 0.0) * materials.get('iron_price', 0.0),
-            'oil': materials.get('oil_kg', 0.0) * materials.get('oil_price', 0.0),
-            'other': materials.get('other_kg', 0.0) * materials.get('other_price', 0.0),
-            'small_beer_box': materials.get('small_beer_box_kg', 0.0) * materials.get('small_beer_box_price', 0.0),
-            'large_beer_box': materials.get('large_beer_box_kg', 0.0) * materials.get('large_beer_box_price', 0.0),
-            'mixed_beer_box': materials.get('mixed_beer_box_kg', 0.0) * materials.get('mixed_beer_box_price', 0.0),
-            'colored_plastic': materials.get('colored_plastic_kg', 0.0) * materials.get('colored_plastic_price', 0.0),
-            'plastic_bag': materials.get('plastic_bag_kg', 0.0) * materials.get('plastic_bag_price', 0.0),
-            'mix': materials.get('mix_kg', 0.0) * materials.get('mix_price', 0.0)
-        }
-        
-        total_pay = sum(totals.values())
-        
-        # Создаем shipment с явным указанием всех полей
+async def add_shipment(point_id, user_id, items, session=None):
+    """
+    Создает отгрузку. items — {material: (kg, цена за кг)} с ключами из app.materials.
+    В shipment_items пишутся только строки с ненулевым весом; дневная сводка
+    обновляется в той же транзакции. Возвращает отгрузку (total_pay уже посчитан).
+    """
+    async with session_scope(session, commit=True) as session:
+        lines = {}
+        for material, (kg, price_per_kg) in items.items():
+            if material not in MATERIALS_BY_KEY:
+                raise ValueError(f"Неизвестный материал: {material}")
+            if kg:
+                lines[material] = (kg, price_per_kg, kg * price_per_kg)
+
+        timestamp = datetime.utcnow()
         shipment = Shipment(
+            timestamp=timestamp,
             point_id=point_id,
             user_id=user_id,
-            # Основные материалы (категория 1)
-            pet_kg=materials.get('pet_kg', 0.0),
-            pet_price=materials.get('pet_price', 0.0),
-            pet_total=totals['pet'],
-            
-            paper_kg=materials.get('paper_kg', 0.0),
-            paper_price=materials.get('paper_price', 0.0),
-            paper_total=totals['paper'],
-            
-            alum_kg=materials.get('alum_kg', 0.0),
-            alum_price=materials.get('alum_price', 0.0),
-            alum_total=totals['alum'],
-            
-            glass_kg=materials.get('glass_kg', 0.0),
-            glass_price=materials.get('glass_price', 0.0),
-            glass_total=totals['glass'],
-            
-            small_beer_box_kg=materials.get('small_beer_box_kg', 0.0),
-            small_beer_box_price=materials.get('small_beer_box_price', 0.0),
-            small_beer_box_total=totals['small_beer_box'],
-            
-            large_beer_box_kg=materials.get('large_beer_box_kg', 0.0),
-            large_beer_box_price=materials.get('large_beer_box_price', 0.0),
-            large_beer_box_total=totals['large_beer_box'],
-            
-            mixed_beer_box_kg=materials.get('mixed_beer_box_kg', 0.0),
-            mixed_beer_box_price=materials.get('mixed_beer_box_price', 0.0),
-            mixed_beer_box_total=totals['mixed_beer_box'],
-            
-            # Другие материалы (категория 2)
-            oil_kg=materials.get('oil_kg', 0.0),
-            oil_price=materials.get('oil_price', 0.0),
-            oil_total=totals['oil'],
-            
-            colored_plastic_kg=materials.get('colored_plastic_kg', 0.0),
-            colored_plastic_price=materials.get('colored_plastic_price', 0.0),
-            colored_plastic_total=totals['colored_plastic'],
-            
-            iron_kg=materials.get('iron_kg', 0.0),
-            iron_price=materials.get('iron_price', 0.0),
-            iron_total=totals['iron'],
-            
-            plastic_bag_kg=materials.get('plastic_bag_kg', 0.0),
-            plastic_bag_price=materials.get('plastic_bag_price', 0.0),
-            plastic_bag_total=totals['plastic_bag'],
-            
-            mix_kg=materials.get('mix_kg', 0.0),
-            mix_price=materials.get('mix_price', 0.0),
-            mix_total=totals['mix'],
-            
-            other_kg=materials.get('other_kg', 0.0),
-            other_price=materials.get('other_price', 0.0),
-            other_total=totals['other'],
-            
-            # Итоговая сумма
-            total_pay=total_pay
-        )
-        
+            items=[
+                ShipmentItem(material=material, kg=kg, price_per_kg=price_per_kg, total=total)
+                for material, (kg, price_per_kg, total) in lines.items()],
+            total_pay=sum(total for _, _, total in lines.values()))
         session.add(shipment)
-        await session.commit()
+
+        # Дневная сводка обновляется в той же транзакции
+        await add_to_shipment_daily(session, timestamp.date(), int(point_id), {
+            material: (kg, total) for material, (kg, _, total) in lines.items()})
+        return shipment
+
+async def get_shipment_totals(date_from, date_to, region_id=None, zone_id=None, point_id=None):
+    """
+    Итоги отгрузок за период [date_from, date_to] по дневной сводке, без чтения shipments.
+    Фильтр по региону/зоне идет через текущую принадлежность точки.
+    Возвращает {material: (kg, revenue, shipments)}.
+    """
+    async def read(session):
+        stmt = (
+            select(
+                ShipmentDaily.material,
+                func.sum(ShipmentDaily.kg),
+                func.sum(ShipmentDaily.revenue),
+                func.sum(ShipmentDaily.shipments))
+            .where(ShipmentDaily.day.between(date_from, date_to))
+            .group_by(ShipmentDaily.material))
+        if point_id is not None:
+            stmt = stmt.where(ShipmentDaily.point_id == int(point_id))
+        if zone_id is not None or region_id is not None:
+            stmt = stmt.join(Point, Point.point_id == ShipmentDaily.point_id)
+            if zone_id is not None:
+                stmt = stmt.where(Point.zone_id == int(zone_id))
+            if region_id is not None:
+                stmt = stmt.join(Zone, Zone.zone_id == Point.zone_id).where(Zone.region_id == int(region_id))
+        result = await session.execute(stmt)
+        return {material: (kg, revenue, shipments) for material, kg, revenue, shipments in result}
+    return await _report_read(read)
 
 async def get_report_data():
-    async with async_session() as session:
-        shipments = await session.scalars(select(Shipment))
-        
+    async def read(session):
+        # Только нужные колонки, без ORM-объектов
+        shipments = await session.execute(
+            select(Shipment.timestamp, Shipment.point_id, Shipment.user_id, Shipment.total_pay))
+
         report_data = []
-        for shipment in shipments:
+        for timestamp, point_id, user_id, total_pay in shipments:
             report_data.append({
-                "date": shipment.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                "point_id": shipment.point_id,
-                "user_id": shipment.user_id,
-                "total_pay": shipment.total_pay,
+                "date": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                "point_id": point_id,
+                "user_id": user_id,
+                "total_pay": total_pay,
                 # Добавьте другие нужные поля из Shipment
             })
         
         return report_data
+    return await _report_read(read)
 
-async def get_requests_by_point(point_id):
-    async with async_session() as session:
+async def get_requests_by_point(point_id, session=None):
+    async with session_scope(session) as session:
         requests = await session.scalars(
             select(Request)
             .where(Request.point_id == point_id)
             .order_by(desc(Request.timestamp)))
         return requests.all()
 
-async def get_shipments_by_point(point_id):
-    async with async_session() as session:
+async def get_shipments_by_point(point_id, session=None):
+    async with session_scope(session) as session:
         shipments = await session.scalars(
             select(Shipment)
             .where(Shipment.point_id == point_id)
             .order_by(desc(Shipment.timestamp)))
         return shipments.all()
 
+class HistoryPage(NamedTuple):
+    """
+    Страница истории точки (от новых к старым).
+    newer/older — курсоры (timestamp, id) для соседних страниц или None, если их нет.
+    """
+    items: list
+    newer: tuple
+    older: tuple
+
+def _history_query(model, id_key, point_id, before, after):
+    ts, row_id = model.timestamp, getattr(model, id_key)
+    stmt = select(model).where(model.point_id == int(point_id))
+    if after is not None:
+        after_ts, after_id = after
+        return (stmt
+                .where(ts >= after_ts, or_(ts > after_ts, row_id > after_id))
+                .order_by(ts, row_id))
+    if before is not None:
+        before_ts, before_id = before
+        stmt = stmt.where(ts <= before_ts, or_(ts < before_ts, row_id < before_id))
+    return stmt.order_by(ts.desc(), row_id.desc())
+
+async def _history_page(hot, id_key, point_id, before, after, limit, session):
+    """
+    Keyset-пагинация по (timestamp, id) внутри точки: каждая страница —
+    диапазонный проход по индексу (point_id, timestamp) без OFFSET.
+    before — страница старше курсора, after — новее курсора, без курсора — самые новые.
+    Если месяцы перенесены в архив, страница добирается из архива: горячий уровень
+    всегда новее границы, поэтому уровни просто читаются по очереди.
+    """
+    async with session_scope(session) as session:
+        boundary = await archive_boundary(session, hot)
+        if boundary is None:
+            tiers = [hot]
+        else:
+            tiers = []
+            if before is None or before[0] >= boundary:
+                tiers.append(hot)
+            if after is None or after[0] < boundary:
+                tiers.append(ARCHIVED[hot])
+            if after is not None:
+                tiers.reverse()
+
+        rows = []
+        for model in tiers:
+            if len(rows) > limit:
+                break
+            stmt = _history_query(model, id_key, point_id, before, after)
+            if model is hot and boundary is not None:
+                stmt = stmt.where(hot.timestamp >= boundary)
+            rows += (await session.scalars(stmt.limit(limit + 1 - len(rows)))).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if after is not None:
+        rows.reverse()
+        has_newer, has_older = more, True
+    else:
+        has_newer, has_older = before is not None, more
+
+    def cursor(row):
+        return row.timestamp, getattr(row, id_key)
+
+    return HistoryPage(
+        items=rows,
+        newer=cursor(rows[0]) if rows and has_newer else None,
+        older=cursor(rows[-1]) if rows and has_older else None)
+
+async def get_requests_page(point_id, before=None, after=None, limit=HISTORY_PAGE_SIZE, session=None):
+    """Страница заявок точки по курсору (timestamp, request_id)"""
+    return await _history_page(Request, 'request_id', point_id, before, after, limit, session)
+
+async def get_shipments_page(point_id, before=None, after=None, limit=HISTORY_PAGE_SIZE, session=None):
+    """Страница отгрузок точки по курсору (timestamp, shipment_id)"""
+    return await _history_page(Shipment, 'shipment_id', point_id, before, after, limit, session)
+
 async def get_all_requests_sorted():
-    """Получить все заявки, отсортированные по дате (от старых к новым)"""
-    async with async_session() as session:
-        requests = await session.scalars(
-            select(Request)
-            .order_by(Request.timestamp)
-        )
-        return requests.all()
+    """Получить все заявки, отсортированные по дате (от старых к новым), как строки Core"""
+    return [request async for request in stream_requests_sorted()]
 
 async def get_all_shipments_sorted():
-    """Получить все отгрузки, отсортированные по дате (от старых к новым)"""
-    async with async_session() as session:
-        shipments = await session.scalars(
-            select(Shipment)
-            .order_by(Shipment.timestamp)
-        )
-        return shipments.all()
+    """Получить все отгрузки, отсортированные по дате (от старых к новым), как ShipmentRow"""
+    return [shipment async for shipment in stream_shipments_sorted()]
+
+class ShipmentRow(NamedTuple):
+    """
+    Легкая строка отгрузки для выгрузок и отчетов: только нужные колонки
+    и строки материалов, без ORM-объекта, identity map и инструментирования.
+    """
+    shipment_id: int
+    timestamp: datetime
+    point_id: int
+    user_id: int
+    total_pay: float
+    lines: dict  # material -> (кг, цена за кг, сумма), только ненулевые строки
+
+    def line(self, material):
+        """(кг, цена за кг, сумма) по материалу; для отсутствующей строки — нули"""
+        return self.lines.get(material, (0.0, 0.0, 0.0))
+
+# Таблица строк материалов для горячей и архивной отгрузок
+_SHIPMENT_ITEMS = {
+    Shipment: ShipmentItem,
+    ArchivedShipment: ArchivedShipmentItem,
+}
+
+def _as_datetime(value):
+    """Граница периода как datetime: дата — это её полночь"""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time.min)
+    return value
+
+async def _tiers(session, hot, date_from=None, date_to=None):
+    """
+    Уровни хранения для периода [date_from, date_to) от старых к новым: [(модель, начало, конец)].
+    Границы — date или datetime. Уровень, который в период не попадает, не возвращается.
+    """
+    date_from, date_to = _as_datetime(date_from), _as_datetime(date_to)
+    boundary = await archive_boundary(session, hot)
+    if boundary is None:
+        return [(hot, date_from, date_to)]
+    tiers = []
+    if date_from is None or date_from < boundary:
+        tiers.append((ARCHIVED[hot], date_from, min(date_to or boundary, boundary)))
+    if date_to is None or date_to > boundary:
+        tiers.append((hot, max(date_from or boundary, boundary), date_to))
+    return tiers
+
+def _in_period(stmt, timestamp, row_id, start, end, after):
+    """Период [start, end) и продолжение после курсора after = (timestamp, id)"""
+    if start is not None:
+        stmt = stmt.where(timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(timestamp < end)
+    if after is not None:
+        after_ts, after_id = after
+        stmt = stmt.where(timestamp >= after_ts, or_(timestamp > after_ts, row_id > after_id))
+    return stmt.order_by(timestamp, row_id).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+async def _requests_from(session, date_from, date_to, after):
+    """Заявки периода по (timestamp, request_id) после курсора after, в сессии вызывающего"""
+    for model, start, end in await _tiers(session, Request, date_from, date_to):
+        requests = model.__table__
+        rows = await session.stream(_in_period(
+            select(requests), requests.c.timestamp, requests.c.request_id, start, end, after))
+        async for row in rows:
+            yield row
+
+async def _shipments_from(session, date_from, date_to, after):
+    """Отгрузки периода как ShipmentRow по (timestamp, shipment_id) после курсора after"""
+    for model, start, end in await _tiers(session, Shipment, date_from, date_to):
+        shipments, items = model.__table__, _SHIPMENT_ITEMS[model].__table__
+        rows = await session.stream(_in_period(
+            select(
+                shipments.c.shipment_id, shipments.c.timestamp, shipments.c.point_id,
+                shipments.c.user_id, shipments.c.total_pay,
+                items.c.material, items.c.kg, items.c.price_per_kg, items.c.total)
+            .outerjoin(items, items.c.shipment_id == shipments.c.shipment_id),
+            shipments.c.timestamp, shipments.c.shipment_id, start, end, after))
+
+        current = None
+        async for shipment_id, timestamp, point_id, user_id, total_pay, material, kg, price, total in rows:
+            if current is None or current.shipment_id != shipment_id:
+                if current is not None:
+                    yield current
+                current = ShipmentRow(shipment_id, timestamp, point_id, user_id, total_pay, {})
+            if material is not None:
+                current.lines[material] = (kg, price, total)
+        if current is not None:
+            yield current
+
+def stream_requests_sorted(date_from=None, date_to=None):
+    """
+    Потоково отдает заявки по дате (от старых к новым), включая архив,
+    как строки Core (Row) с теми же именами полей, что у Request.
+    В Postgres условие по timestamp отсекает лишние месячные секции архива.
+    Порядок (timestamp, request_id) позволяет продолжить чтение после сбоя реплики.
+    """
+    return _report_stream(
+        lambda session, after: _requests_from(session, date_from, date_to, after),
+        lambda after, row: (row.timestamp, row.request_id))
+
+def stream_shipments_sorted(date_from=None, date_to=None):
+    """
+    Потоково отдает отгрузки по дате (от старых к новым), включая архив, как ShipmentRow.
+    Отгрузки и их строки читаются одним LEFT JOIN, упорядоченным по отгрузке,
+    и собираются в ShipmentRow по мере чтения.
+    """
+    # Недособранная отгрузка при повторе читается заново целиком
+    return _report_stream(
+        lambda session, after: _shipments_from(session, date_from, date_to, after),
+        lambda after, shipment: (shipment.timestamp, shipment.shipment_id))
+
+def _advance_activity(after, item):
+    """Позиция потока активности: пара курсоров (заявки, отгрузки)"""
+    request_after, shipment_after = after or (None, None)
+    kind, row = item
+    if kind == "request":
+        return (row.timestamp, row.request_id), shipment_after
+    return request_after, (row.timestamp, row.shipment_id)
+
+def stream_activity(date_from=None, date_to=None):
+    """
+    Единый поток активности: заявки и отгрузки, слитые по дате.
+    Отдает пары ("request", строка заявки) и ("shipment", ShipmentRow)
+    с теми же полями, что у Request и Shipment, в том числе для архивных месяцев.
+    Обе таблицы читаются двумя серверными курсорами на одном соединении,
+    поэтому отчет занимает из пула ровно одно соединение; оба потока уже
+    отсортированы, и в памяти держим по одной записи из каждого.
+    """
+    async def stream(session, after):
+        request_after, shipment_after = after or (None, None)
+        requests = _requests_from(session, date_from, date_to, request_after)
+        shipments = _shipments_from(session, date_from, date_to, shipment_after)
+        request = await anext(requests, None)
+        shipment = await anext(shipments, None)
+
+        while request is not None or shipment is not None:
+            if shipment is None or (request is not None and request.timestamp <= shipment.timestamp):
+                yield "request", request
+                request = await anext(requests, None)
+            else:
+                yield "shipment", shipment
+                shipment = await anext(shipments, None)
+
+    return _report_stream(stream, _advance_activity)
+
+async def get_activity_presence():
+    """
+    Есть ли в базе заявки и отгрузки: (has_requests, has_shipments) одним запросом.
+    Перенесенные в архив месяцы тоже считаются (по записи границы в archive_state).
+    """
+    async def read(session):
+        result = await session.execute(
+            select(
+                or_(select(Request.request_id).exists(),
+                    select(ArchiveState.table_name).where(ArchiveState.table_name == Request.__tablename__).exists()),
+                or_(select(Shipment.shipment_id).exists(),
+                    select(ArchiveState.table_name).where(ArchiveState.table_name == Shipment.__tablename__).exists())))
+        has_requests, has_shipments = result.one()
+        return bool(has_requests), bool(has_shipments)
+    return await _report_read(read)
+
+def _request_item(r):
+    return {
+        "type": "request",
+        "timestamp": r.timestamp,
+        "point_id": r.point_id,
+        "user_id": r.user_id,
+        "activity": r.activity,
+        "pet": r.pet_bag or 0,
+        "aluminum": r.aluminum_bag or 0,
+        "glass": r.glass_bag or 0,
+        "other": r.other or 0,
+        "total": (r.pet_bag or 0) + (r.aluminum_bag or 0) + 
+                (r.glass_bag or 0) + (r.other or 0)
+    }
+
+def _shipment_item(s):
+    item = {
+        "type": "shipment",
+        "timestamp": s.timestamp,
+        "point_id": s.point_id,
+        "user_id": s.user_id,
+    }
+    for material in MATERIALS:
+        kg, price, total = s.line(material.key)
+        item[f"{material.key}_kg"] = kg
+        item[f"{material.key}_price"] = price
+        item[f"{material.key}_total"] = total
+    item["total_pay"] = s.total_pay
+    return item
 
 async def get_combined_data_sorted():
-    async with async_session() as session:
-        requests = await session.scalars(
-            select(Request)
-            .order_by(Request.timestamp)
-        )
-        shipments = await session.scalars(
-            select(Shipment)
-            .order_by(Shipment.timestamp)
-        )
-        
-        request_data = [
-            {
-                "type": "request",
-                "timestamp": r.timestamp,
-                "point_id": r.point_id,
-                "user_id": r.user_id,
-                "activity": r.activity,
-                "pet": r.pet_bag or 0,
-                "aluminum": r.aluminum_bag or 0,
-                "glass": r.glass_bag or 0,
-                "other": r.other or 0,
-                "total": (r.pet_bag or 0) + (r.aluminum_bag or 0) + 
-                        (r.glass_bag or 0) + (r.other or 0)
-            }
-            for r in requests
-        ]
-        
-        shipment_data = [
-            {
-                "type": "shipment",
-                "timestamp": s.timestamp,
-                "point_id": s.point_id,
-                "user_id": s.user_id,
-                # Основные материалы
-                "pet_kg": s.pet_kg,
-                "pet_price": s.pet_price,
-                "pet_total": s.pet_total,
-                "paper_kg": s.paper_kg,
-                "paper_price": s.paper_price,
-                "paper_total": s.paper_total,
-                "alum_kg": s.alum_kg,
-                "alum_price": s.alum_price,
-                "alum_total": s.alum_total,
-                "glass_kg": s.glass_kg,
-                "glass_price": s.glass_price,
-                "glass_total": s.glass_total,
-                "small_beer_box_kg": s.small_beer_box_kg,
-                "small_beer_box_price": s.small_beer_box_price,
-                "small_beer_box_total": s.small_beer_box_total,
-                "large_beer_box_kg": s.large_beer_box_kg,
-                "large_beer_box_price": s.large_beer_box_price,
-                "large_beer_box_total": s.large_beer_box_total,
-                "mixed_beer_box_kg": s.mixed_beer_box_kg,
-                "mixed_beer_box_price": s.mixed_beer_box_price,
-                "mixed_beer_box_total": s.mixed_beer_box_total,
-                # Другие материалы
-                "oil_kg": s.oil_kg,
-                "oil_price": s.oil_price,
-                "oil_total": s.oil_total,
-                "colored_plastic_kg": s.colored_plastic_kg,
-                "colored_plastic_price": s.colored_plastic_price,
-                "colored_plastic_total": s.colored_plastic_total,
-                "iron_kg": s.iron_kg,
-                "iron_price": s.iron_price,
-                "iron_total": s.iron_total,
-                "plastic_bag_kg": s.plastic_bag_kg,
-                "plastic_bag_price": s.plastic_bag_price,
-                "plastic_bag_total": s.plastic_bag_total,
-                "mix_kg": s.mix_kg,
-                "mix_price": s.mix_price,
-                "mix_total": s.mix_total,
-                "other_kg": s.other_kg,
-                "other_price": s.other_price,
-                "other_total": s.other_total,
-                "total_pay": s.total_pay
-            }
-            for s in shipments
-        ]
-        
-        combined = request_data + shipment_data
-        return sorted(combined, key=lambda x: x["timestamp"])
+    """Заявки и отгрузки в виде словарей, отсортированные по дате (слияние на потоках)"""
+    return [
+        _request_item(obj) if kind == "request" else _shipment_item(obj)
+        async for kind, obj in stream_activity()
+    ]
 
-async def delete_point_and_related_data(point_id: str):
+async def delete_point_and_related_data(point_id: str, session=None):
     """
-    Удаляет точку и связанные данные:
-    - Отгрузки сохраняем, переназначая на системного пользователя (tg_id=0)
-    - Заявки (requests) удаляем полностью
-    - Пользователя удаляем
-    - Точку удаляем
+    Мягко удаляет точку: ставит Point.deleted_at, снимает её со счетчиков зоны
+    и убирает из справочника и кэша привязок — точка сразу пропадает из всех поисков.
+    Транзакция короткая: блокируется только строка точки. Заявки, пользователи
+    и сама строка удаляются позже фоновой очисткой (см. purge_deleted_point).
+    Коммитит транзакцию сам, в том числе переданную сессию апдейта.
+    Возвращает False, если активной точки нет или произошла ошибка.
     """
-    async with async_session() as session:
+    async with session_scope(session) as session:
         try:
-            # 1. Находим пользователя, связанного с точкой
-            user = await session.scalar(
-                select(User)
-                .where(User.point_id == int(point_id))
-            )
-            
-            if not user:
-                # Если пользователя нет, просто удаляем точку и заявки
-                await session.execute(
-                    delete(Request)
-                    .where(Request.point_id == int(point_id))
-                )
-                await session.execute(
-                    delete(Point)
-                    .where(Point.point_id == int(point_id))
-                )
-                await session.commit()
-                return True
-
-            # 2. Создаем/проверяем системного пользователя
-            system_user = await session.scalar(
-                select(User)
-                .where(User.tg_id == 0)
-            )
-            
-            if not system_user:
-                system_user = User(tg_id=0, point_id=None)
-                session.add(system_user)
-                await session.flush()  # Сохраняем, чтобы получить ID
-
-            # 3. Переназначаем отгрузки на системного пользователя
+            locked = await lock_points(session, [int(point_id)])
+            if not locked:
+                return False
+            for zone_id, bags_count in locked.values():
+                await adjust_zone_stats(session, {zone_id: (-1, -(bags_count or 0))})
+
             await session.execute(
-                update(Shipment)
-                .where(Shipment.user_id == user.tg_id)
-                .values(user_id=system_user.tg_id)
-            )
+                update(Point)
+                .where(Point.point_id == int(point_id))
+                .values(deleted_at=datetime.utcnow()))
+            after_commit(session, directory.remove_point, int(point_id))
+            after_commit(session, bindings.invalidate_point, int(point_id))
+            await session.commit()
+            return True
 
-            # 4. Удаляем все заявки точки (requests)
+        except Exception as e:
+            await session.rollback()
+            print(f"Error deleting point {point_id}: {str(e)}")
+            return False
+
+async def get_points_to_purge(limit=100):
+    """
+    Мягко удаленные точки, по которым еще есть что чистить: заявки, пользователи
+    или сама строка (если на точку больше не ссылаются отгрузки). Старые удаления первыми.
+    """
+    def referenced(model):
+        return select(model.point_id).where(model.point_id == Point.point_id).exists()
+
+    async with async_session() as session:
+        point_ids = await session.scalars(
+            select(Point.point_id)
+            .where(
+                Point.deleted_at.is_not(None),
+                or_(referenced(Request), referenced(User), ~referenced(Shipment)))
+            .order_by(Point.deleted_at)
+            .limit(limit))
+        return point_ids.all()
+
+async def purge_deleted_point(point_id, batch_size):
+    """
+    Удаляет данные мягко удаленной точки короткими транзакциями по batch_size строк,
+    чтобы не держать блокировки, пока водители пишут свои данные:
+    - заявки (requests) удаляем полностью;
+    - отгрузки пользователей точки переназначаем на системного пользователя (tg_id=0),
+      самих пользователей удаляем;
+    - строку точки удаляем, если на неё не ссылаются отгрузки (история отгрузок
+      сохраняется, а точка остается скрытой записью с deleted_at).
+    """
+    while True:
+        async with async_session() as session:
+            batch = select(Request.request_id).where(Request.point_id == point_id).limit(batch_size)
+            result = await session.execute(
+                delete(Request)
+                .where(Request.request_id.in_(batch))
+                .execution_options(synchronize_session=False))
+            await session.commit()
+        if result.rowcount < batch_size:
+            break
+
+    async with async_session() as session:
+        user_ids = (await session.scalars(select(User.tg_id).where(User.point_id == point_id))).all()
+    if user_ids:
+        async with async_session() as session:
             await session.execute(
+                dialect_insert(User)
+                .values(tg_id=0, point_id=None)
+                .on_conflict_do_nothing(index_elements=[User.tg_id]))
+            await session.commit()
+        while True:
+            async with async_session() as session:
+                batch = select(Shipment.shipment_id).where(Shipment.user_id.in_(user_ids)).limit(batch_size)
+                result = await session.execute(
+                    update(Shipment)
+                    .where(Shipment.shipment_id.in_(batch))
+                    .values(user_id=0)
+                    .execution_options(synchronize_session=False))
+                await session.commit()
+            if result.rowcount < batch_size:
+                break
+
+    async with async_session() as session:
+        await session.execute(delete(User).where(User.point_id == point_id))
+        await session.execute(
+            delete(Point)
+            .where(
+                Point.point_id == point_id,
+                Point.deleted_at.is_not(None),
+                ~select(Shipment.shipment_id).where(Shipment.point_id == point_id).exists()))
+        # Привязки удаленных пользователей к точке больше не действительны
+        after_commit(session, bindings.invalidate_point, point_id)
+        await session.commit()
+    _known_users.difference_update(user_ids)
+
+class BulkDeleteResult(NamedTuple):
+    """Итог массового удаления точек"""
+    points: int  # Удалено (скрыто) точек
+    requests: int  # Удалено заявок
+    shipments: int  # Отгрузок переназначено на системного пользователя
+    users: int  # Удалено пользователей
+
+async def delete_points_bulk(point_ids=None, zone_id=None, region_id=None, session=None):
+    """
+    Удаляет сразу много точек: по списку id, по зоне или по региону.
+    Всё делается набором выражений по множеству точек в одной транзакции:
+    блокировка точек, deleted_at и счетчики зон, удаление заявок, один системный
+    пользователь, переназначение отгрузок, удаление пользователей и строк точек.
+    Строки точек, на которые ссылаются отгрузки, остаются скрытыми (deleted_at).
+    Коммитит транзакцию сам, в том числе переданную сессию апдейта.
+    """
+    targets = select(Point.point_id).where(Point.deleted_at.is_(None))
+    if point_ids is not None:
+        targets = targets.where(Point.point_id.in_([int(point_id) for point_id in point_ids]))
+    elif zone_id is not None:
+        targets = targets.where(Point.zone_id == int(zone_id))
+    elif region_id is not None:
+        targets = targets.join(Zone, Zone.zone_id == Point.zone_id).where(Zone.region_id == int(region_id))
+    else:
+        raise ValueError("Не указаны точки для удаления")
+
+    async with session_scope(session) as session:
+        try:
+            locked = await lock_points(session, (await session.scalars(targets)).all())
+            if not locked:
+                return BulkDeleteResult(0, 0, 0, 0)
+            ids = list(locked)
+
+            deltas = {}
+            for zone, bags_count in locked.values():
+                points, bags = deltas.get(zone, (0, 0))
+                deltas[zone] = (points - 1, bags - (bags_count or 0))
+            await adjust_zone_stats(session, deltas)
+            await session.execute(
+                update(Point)
+                .where(Point.point_id.in_(ids))
+                .values(deleted_at=datetime.utcnow())
+                .execution_options(synchronize_session=False))
+
+            requests = await session.execute(
                 delete(Request)
-                .where(Request.point_id == int(point_id))
-            )
+                .where(Request.point_id.in_(ids))
+                .execution_options(synchronize_session=False))
 
-            # 5. Удаляем оригинального пользователя
-            await session.delete(user)
+            point_users = select(User.tg_id).where(User.point_id.in_(ids))
+            user_ids = (await session.scalars(point_users)).all()
+            shipments_count = 0
+            if user_ids:
+                await session.execute(
+                    dialect_insert(User)
+                    .values(tg_id=0, point_id=None)
+                    .on_conflict_do_nothing(index_elements=[User.tg_id]))
+                shipments = await session.execute(
+                    update(Shipment)
+                    .where(Shipment.user_id.in_(user_ids))
+                    .values(user_id=0)
+                    .execution_options(synchronize_session=False))
+                shipments_count = shipments.rowcount
+                await session.execute(
+                    delete(User)
+                    .where(User.tg_id.in_(user_ids))
+                    .execution_options(synchronize_session=False))
 
-            # 6. Удаляем саму точку
             await session.execute(
                 delete(Point)
-                .where(Point.point_id == int(point_id))
-            )
-
+                .where(
+                    Point.point_id.in_(ids),
+                    ~select(Shipment.shipment_id).where(Shipment.point_id == Point.point_id).exists())
+                .execution_options(synchronize_session=False))
+
+            for point_id in ids:
+                after_commit(session, directory.remove_point, point_id)
+                after_commit(session, bindings.invalidate_point, point_id)
             await session.commit()
-            return True
-            
-        except Exception as e:
+            _known_users.difference_update(user_ids)
+            return BulkDeleteResult(len(ids), requests.rowcount, shipments_count, len(user_ids))
+
+        except Exception:
             await session.rollback()
-            print(f"Error deleting point {point_id}: {str(e)}")
-            return False
\ No newline at end of file
+            raise
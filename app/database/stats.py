@@ -0,0 +1,155 @@
+from collections import defaultdict
+
+from sqlalchemy import select, update, delete, insert, func, bindparam, union_all, Date
+
+from app.database.models import async_session, dialect_insert
+from app.database.models import Point, Zone, ZoneStats, Shipment, ShipmentItem, ShipmentDaily
+from app.database.directory import directory, after_commit
+from app.database.archive import ArchivedShipment, ArchivedShipmentItem, archive_boundary
+
+
+_zone_stats_delta = (
+    update(ZoneStats.__table__)
+    .where(ZoneStats.__table__.c.zone_id == bindparam('b_zone_id'))
+    .values(
+        point_count=ZoneStats.__table__.c.point_count + bindparam('b_points'),
+        bags_count=ZoneStats.__table__.c.bags_count + bindparam('b_bags')))
+
+
+async def adjust_zone_stats(session, deltas):
+    """
+    Прибавляет к счетчикам зон приращения {zone_id: (points, bags)}
+    одним executemany в транзакции вызывающего.
+    """
+    params = [
+        {'b_zone_id': zone_id, 'b_points': points, 'b_bags': bags}
+        for zone_id, (points, bags) in deltas.items()
+        if points or bags]
+    if params:
+        await session.execute(_zone_stats_delta, params)
+
+
+async def lock_points(session, point_ids):
+    """
+    Блокирует строки точек до конца транзакции (SELECT ... FOR UPDATE, в SQLite —
+    через соединение-писатель) и возвращает {point_id: (zone_id, bags_count)}.
+    Нужно, чтобы приращения считались от значения, которое никто не изменит до коммита.
+    """
+    result = await session.execute(
+        select(Point.point_id, Point.zone_id, Point.bags_count)
+        .where(Point.point_id.in_(point_ids), Point.deleted_at.is_(None))
+        .with_for_update())
+    return {point_id: (zone_id, bags_count) for point_id, zone_id, bags_count in result}
+
+
+async def set_bags_counts(session, counts):
+    """
+    Записывает новые Point.bags_count {point_id: bags_count} пакетным UPDATE
+    и переносит разницу в счетчики зон в той же транзакции.
+    Несуществующие и удаленные точки пропускаются.
+    """
+    current = await lock_points(session, list(counts))
+    if not current:
+        return
+
+    deltas = defaultdict(lambda: (0, 0))
+    for point_id, (zone_id, old_count) in current.items():
+        points, bags = deltas[zone_id]
+        deltas[zone_id] = (points, bags + counts[point_id] - (old_count or 0))
+
+    await session.execute(
+        update(Point),
+        [{'point_id': point_id, 'bags_count': counts[point_id]} for point_id in current])
+    await adjust_zone_stats(session, deltas)
+    for point_id in current:
+        after_commit(session, directory.set_bags_count, point_id, counts[point_id])
+
+
+def fill_zone_stats():
+    """INSERT ... SELECT счетчиков всех зон по активным точкам (таблица должна быть пуста)"""
+    return insert(ZoneStats).from_select(
+        ['zone_id', 'point_count', 'bags_count'],
+        select(
+            Zone.zone_id,
+            func.count(Point.point_id),
+            func.coalesce(func.sum(Point.bags_count), 0))
+        .outerjoin(Point, (Point.zone_id == Zone.zone_id) & Point.deleted_at.is_(None))
+        .group_by(Zone.zone_id))
+
+
+async def refresh_zone_stats():
+    """
+    Полностью пересчитывает счетчики зон по активным точкам.
+    Первое заполнение делает миграция; здесь — исправление расхождений
+    после ручных правок данных (python -m app.database.maintenance refresh-zone-stats).
+    """
+    async with async_session() as session:
+        await session.execute(delete(ZoneStats))
+        await session.execute(fill_zone_stats())
+        await session.commit()
+
+
+async def add_to_shipment_daily(session, day, point_id, lines):
+    """
+    Добавляет строки отгрузки {material: (kg, revenue)} в дневную сводку
+    одним INSERT ... ON CONFLICT DO UPDATE в транзакции вызывающего.
+    Нулевые строки не пишутся.
+    """
+    rows = [
+        {'day': day, 'point_id': point_id, 'material': material,
+         'kg': kg, 'revenue': revenue, 'shipments': 1}
+        for material, (kg, revenue) in lines.items()
+        if kg or revenue]
+    if not rows:
+        return
+
+    stmt = dialect_insert(ShipmentDaily)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ShipmentDaily.day, ShipmentDaily.point_id, ShipmentDaily.material],
+        set_={
+            'kg': ShipmentDaily.kg + stmt.excluded.kg,
+            'revenue': ShipmentDaily.revenue + stmt.excluded.revenue,
+            'shipments': ShipmentDaily.shipments + stmt.excluded.shipments,
+        })
+    await session.execute(stmt, rows)
+
+
+async def backfill_shipment_daily():
+    """
+    Пересобирает дневную сводку по всей истории отгрузок, включая архив,
+    одним INSERT ... SELECT из shipment_items (UNION ALL с архивными строками) с GROUP BY.
+    Возвращает количество строк сводки.
+    """
+    async with async_session() as session:
+        boundary = await archive_boundary(session, Shipment)
+        hot = (
+            select(Shipment.timestamp, Shipment.point_id, ShipmentItem.material, ShipmentItem.kg, ShipmentItem.total)
+            .join(ShipmentItem, ShipmentItem.shipment_id == Shipment.shipment_id))
+        if boundary is None:
+            lines = hot.subquery()
+        else:
+            # Горячий уровень — только новее границы, чтобы не посчитать дважды
+            # месяц, который уже скопирован в архив, но еще не удален из горячих таблиц
+            lines = union_all(
+                select(
+                    ArchivedShipment.timestamp, ArchivedShipment.point_id,
+                    ArchivedShipmentItem.material, ArchivedShipmentItem.kg, ArchivedShipmentItem.total)
+                .join(ArchivedShipmentItem, ArchivedShipmentItem.shipment_id == ArchivedShipment.shipment_id),
+                hot.where(Shipment.timestamp >= boundary)).subquery()
+
+        day = func.date(lines.c.timestamp, type_=Date)
+        await session.execute(delete(ShipmentDaily))
+        await session.execute(
+            insert(ShipmentDaily).from_select(
+                ['day', 'point_id', 'material', 'kg', 'revenue', 'shipments'],
+                select(
+                    day,
+                    lines.c.point_id,
+                    lines.c.material,
+                    func.sum(lines.c.kg),
+                    func.sum(lines.c.total),
+                    func.count())
+                .group_by(day, lines.c.point_id, lines.c.material)))
+        count = await session.scalar(select(func.count()).select_from(ShipmentDaily))
+        await session.commit()
+        return count
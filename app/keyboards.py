@@ -2,6 +2,10 @@ from aiogram.types import (ReplyKeyboardMarkup, KeyboardButton,
                             InlineKeyboardMarkup, InlineKeyboardButton)
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from datetime import datetime, timedelta
+
+from app.materials import CATEGORIES, materials_in
+
 def user_command():
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="เราพร้อมส่งสินค้าแล้ว", callback_data="bag_full")],  # "Мы готовы к отгрузке"
@@ -42,7 +46,10 @@ def admin_keyboard():
         InlineKeyboardButton(text="รายงาน", callback_data="report"),  # "Отчеты"
         InlineKeyboardButton(text="สร้างรายงานบันทึก", callback_data="generate_log_report"),  # "Сформировать лог"
         InlineKeyboardButton(text="สร้างจุด", callback_data="create_point"),  # "Создать точку"
-        InlineKeyboardButton(text="ลบจุด", callback_data="delete_point")
+        InlineKeyboardButton(text="นำเข้าจุดจากไฟล์", callback_data="import_points"),  # "Импорт точек из файла"
+        InlineKeyboardButton(text="ลบจุด", callback_data="delete_point"),
+        InlineKeyboardButton(text="ลบหลายจุด", callback_data="bulk_delete_points"),  # "Удалить несколько точек"
+        InlineKeyboardButton(text="ประวัติจุด", callback_data="point_history")  # "История точки"
     )
     builder.adjust(2)
     return builder.as_markup()
@@ -61,7 +68,8 @@ def report_keyboard():
 def driver_keyboard():
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="เพิ่มการจัดส่ง", callback_data="add_shipment")]  # "Добавить отгрузку"
+            [InlineKeyboardButton(text="เพิ่มการจัดส่ง", callback_data="add_shipment")],  # "Добавить отгрузку"
+            [InlineKeyboardButton(text="ประวัติจุด", callback_data="point_history")]  # "История точки"
         ]
     )
 
@@ -84,42 +92,26 @@ def cancel_keyboard():
     
 def get_category_keyboard():
     buttons = [
-        [InlineKeyboardButton(text="วัสดุหลัก", callback_data="category_main")],
-        [InlineKeyboardButton(text="วัสดุอื่นๆ", callback_data="category_other")],
+        [InlineKeyboardButton(text=title, callback_data=f"category_{category}")]
+        for category, (title, _) in CATEGORIES.items()
+    ]
+    buttons += [
         [InlineKeyboardButton(text="ยืนยัน", callback_data="confirm_shipment")],  # "Подтвердить"
         [InlineKeyboardButton(text="ยกเลิก", callback_data="cancel_shipment")]  # "Отменить"
     ]
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     return keyboard
 
-def get_main_materials_keyboard():
+def get_materials_keyboard(category):
+    """Кнопки материалов категории из реестра app.materials"""
     buttons = [
-        [InlineKeyboardButton(text="Plastic PET", callback_data="material_pet")],
-        [InlineKeyboardButton(text="Paper", callback_data="material_paper")],
-        [InlineKeyboardButton(text="Aluminum", callback_data="material_alum")],
-        [InlineKeyboardButton(text="Glass", callback_data="material_glass")],
-        [InlineKeyboardButton(text="Small Beer Box", callback_data="material_small_beer_box")],
-        [InlineKeyboardButton(text="Large Beer Box", callback_data="material_large_beer_box")],
-        [InlineKeyboardButton(text="Mixed Beer Box", callback_data="material_mixed_beer_box")],
-        [InlineKeyboardButton(text="← กลับ", callback_data="back_to_categories")],
+        [InlineKeyboardButton(text=material.title, callback_data=f"material_{material.key}")]
+        for material in materials_in(category)
     ]
+    buttons.append([InlineKeyboardButton(text="← กลับ", callback_data="back_to_categories")])  # "Назад"
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
     return keyboard
 
-
-
-def get_other_materials_keyboard():
-    buttons = [
-        [InlineKeyboardButton(text="Oil", callback_data="material_oil")],
-        [InlineKeyboardButton(text="Colored Plastic", callback_data="material_colored_plastic")],
-        [InlineKeyboardButton(text="Iron", callback_data="material_iron")],
-        [InlineKeyboardButton(text="Plastic Bag or Container", callback_data="material_plastic_bag")],
-        [InlineKeyboardButton(text="Mix", callback_data="material_mix")],
-        [InlineKeyboardButton(text="Other", callback_data="material_other")],
-        [InlineKeyboardButton(text="← กลับ", callback_data="back_to_categories")],
-    ]
-    keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
-    return keyboard
 def get_confirmation_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="ยืนยัน", callback_data="confirm_shipment")],  # "Подтвердить"
@@ -129,4 +121,36 @@ def get_confirmation_keyboard():
 def get_cancel_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="ยกเลิกการป้อนข้อมูล", callback_data="cancel_during_input")]  # "Отменить ввод"
-    ])
\ No newline at end of file
+    ])
+
+# --- История точки ---
+# callback_data: hist:<r|s>:<point_id>:<a|b|->:<timestamp в мкс>:<id>
+# r — заявки, s — отгрузки; a — страница новее курсора, b — старше, "-" — первая страница
+_EPOCH = datetime(1970, 1, 1)
+
+def _history_data(kind, point_id, direction="-", cursor=None):
+    if cursor is None:
+        return f"hist:{kind}:{point_id}:-"
+    timestamp, row_id = cursor
+    return f"hist:{kind}:{point_id}:{direction}:{(timestamp - _EPOCH) // timedelta(microseconds=1)}:{row_id}"
+
+def parse_history_data(data):
+    """Разбирает callback_data истории: (kind, point_id, before, after)"""
+    _, kind, point_id, direction, *cursor = data.split(":")
+    if direction == "-":
+        return kind, int(point_id), None, None
+    cursor = (_EPOCH + timedelta(microseconds=int(cursor[0])), int(cursor[1]))
+    return kind, int(point_id), cursor if direction == "b" else None, cursor if direction == "a" else None
+
+def history_keyboard(kind, point_id, page):
+    """Навигация по истории точки: новее/старше и переключение заявки/отгрузки"""
+    navigation = []
+    if page.newer:
+        navigation.append(InlineKeyboardButton(text="« ใหม่กว่า", callback_data=_history_data(kind, point_id, "a", page.newer)))  # "Новее"
+    if page.older:
+        navigation.append(InlineKeyboardButton(text="เก่ากว่า »", callback_data=_history_data(kind, point_id, "b", page.older)))  # "Старше"
+
+    other_kind, other_title = ("s", "การจัดส่ง") if kind == "r" else ("r", "คำขอ")  # "Отгрузки" / "Заявки"
+    buttons = [navigation] if navigation else []
+    buttons.append([InlineKeyboardButton(text=f"🔁 {other_title}", callback_data=_history_data(other_kind, point_id))])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
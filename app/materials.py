@@ -0,0 +1,43 @@
+from typing import NamedTuple, Optional
+
+
+class Material(NamedTuple):
+    """Материал отгрузки"""
+    key: str  # Ключ в shipment_items.material, данных FSM и callback_data
+    title: str  # Название на кнопке и в сообщениях
+    label: str  # Короткое название в заголовках отчета
+    category: str  # 'main' — основные материалы, 'other' — другие
+    request_bag: Optional[str] = None  # Поле Request с числом мешков этого материала
+
+
+# Категории: (название кнопки, маркер в сводке отгрузки)
+CATEGORIES = {
+    'main': ("วัสดุหลัก", "🔹"),  # "Основные материалы"
+    'other': ("วัสดุอื่นๆ", "🔸"),  # "Другие материалы"
+}
+
+# Единый реестр материалов: по нему строятся кнопки, обработчики ввода,
+# строки shipment_items и колонки отчетов. Новый материал добавляется только здесь.
+MATERIALS = (
+    # Основные материалы (категория 1)
+    Material('pet', "Plastic PET", "PET", 'main', request_bag='pet_bag'),
+    Material('paper', "Paper", "Paper", 'main'),
+    Material('alum', "Aluminum", "Aluminum", 'main', request_bag='aluminum_bag'),
+    Material('glass', "Glass", "Glass", 'main', request_bag='glass_bag'),
+    Material('small_beer_box', "Small Beer Box", "Small Beer Box", 'main'),
+    Material('large_beer_box', "Large Beer Box", "Large Beer Box", 'main'),
+    Material('mixed_beer_box', "Mixed Beer Box", "Mixed Beer Box", 'main'),
+    # Другие материалы (категория 2)
+    Material('oil', "Oil", "Oil", 'other'),
+    Material('colored_plastic', "Colored Plastic", "Colored Plastic", 'other'),
+    Material('iron', "Iron", "Iron", 'other'),
+    Material('plastic_bag', "Plastic Bag or Container", "Plastic Bag", 'other'),
+    Material('mix', "Mix", "Mix", 'other'),
+    Material('other', "Other", "Other", 'other', request_bag='other'),
+)
+
+MATERIALS_BY_KEY = {material.key: material for material in MATERIALS}
+
+
+def materials_in(category):
+    return [material for material in MATERIALS if material.category == category]
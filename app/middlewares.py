@@ -0,0 +1,33 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.database.models import async_session
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия БД на апдейт Telegram (unit of work).
+    Сессия передается в обработчики аргументом `session`, а функции
+    app.database.requests принимают её необязательным параметром.
+    Соединение берется из пула только при первом запросе, коммит — один в конце апдейта,
+    при исключении транзакция откатывается.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with async_session() as session:
+            data['session'] = session
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await session.rollback()
+                raise
+            if session.in_transaction():
+                await session.commit()
+            return result
@@ -0,0 +1,93 @@
+import csv
+import io
+import re
+from typing import NamedTuple
+
+from openpyxl import load_workbook
+
+from app.database.directory import PointSnapshot
+
+# Колонки файла импорта (первая строка — заголовок, порядок колонок любой)
+IMPORT_COLUMNS = ('point_id', 'point_name', 'point_owner_name', 'phone_number', 'address')
+# Ограничения длины полей Point
+FIELD_LIMITS = {'point_name': 50, 'point_owner_name': 50, 'phone_number': 15, 'address': 100}
+POINT_ID_RE = re.compile(r'^\d{4}$')
+
+
+class RowError(NamedTuple):
+    """Ошибка в строке файла импорта (номер строки как в Excel, с заголовком)"""
+    row: int
+    message: str
+
+
+def _cell(value):
+    """Значение ячейки как строка: числа из Excel без хвоста .0"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _read_rows(filename, content):
+    """Строки файла как кортежи строк; xlsx читается в read-only режиме, csv — потоково"""
+    if filename.lower().endswith('.xlsx'):
+        wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        try:
+            for row in wb.active.iter_rows(values_only=True):
+                yield tuple(_cell(value) for value in row)
+        finally:
+            wb.close()
+    elif filename.lower().endswith('.csv'):
+        text = io.TextIOWrapper(io.BytesIO(content), encoding='utf-8-sig', newline='')
+        for row in csv.reader(text):
+            yield tuple(_cell(value) for value in row)
+    else:
+        raise ValueError("รองรับเฉพาะไฟล์ .xlsx และ .csv")  # "Поддерживаются только файлы .xlsx и .csv"
+
+
+def parse_points_file(filename, content):
+    """
+    Разбирает файл импорта точек и проверяет каждую строку.
+    Возвращает (список PointSnapshot, список RowError); пустые строки пропускаются.
+    Выполняется синхронно — вызывать в пуле потоков.
+    """
+    rows = _read_rows(filename, content)
+    header = [name.lower() for name in next(rows, ())]
+    missing = [name for name in IMPORT_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"ไม่มีคอลัมน์ในหัวตาราง: {', '.join(missing)}")  # "В заголовке нет колонок:"
+    positions = {name: header.index(name) for name in IMPORT_COLUMNS}
+
+    points, errors, seen = [], [], {}
+    for number, row in enumerate(rows, start=2):
+        if not any(row):
+            continue
+        values = {name: row[index] if index < len(row) else '' for name, index in positions.items()}
+
+        point_id = values['point_id']
+        if not POINT_ID_RE.match(point_id):
+            errors.append(RowError(number, f"ID จุดไม่ถูกต้อง '{point_id}' (ต้องเป็น RZZN)"))  # "неверный ID точки (нужно RZZN)"
+            continue
+        if point_id in seen:
+            errors.append(RowError(number, f"ID {point_id} ซ้ำกัน (แถว {seen[point_id]})"))  # "ID повторяется (строка ...)"
+            continue
+        problems = [
+            # "{name} длиннее {limit} символов" / "{name} не заполнено"
+            f"{name} ยาวเกิน {limit} ตัวอักษร" if values[name] else f"{name} ไม่ได้กรอก"
+            for name, limit in FIELD_LIMITS.items()
+            if not values[name] or len(values[name]) > limit]
+        if problems:
+            errors.append(RowError(number, "; ".join(problems)))
+            continue
+
+        seen[point_id] = number
+        points.append(PointSnapshot(
+            point_id=int(point_id),
+            point_name=values['point_name'],
+            point_owner_name=values['point_owner_name'],
+            phone_number=values['phone_number'],
+            address=values['address'],
+            bags_count=0,
+            zone_id=int(point_id[:3])))  # RZZ — регион и номер зоны, как в мастере создания точки
+    return points, errors
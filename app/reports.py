@@ -0,0 +1,160 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from openpyxl import Workbook
+
+from app.database.models import REPORT_WORKERS
+from app.database.requests import stream_activity, get_activity_presence
+from app.materials import MATERIALS
+
+# Отрисовка Excel нагружает CPU, поэтому выполняется в отдельном пуле потоков,
+# а число одновременно формируемых отчетов ограничено размером пула (REPORT_WORKERS;
+# под каждый отчет в пуле читателей SQLite зарезервировано соединение)
+# Сколько строк передаем в пул за один вызов
+RENDER_BATCH_SIZE = 1000
+
+_report_pool = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report')
+_report_slots = asyncio.Semaphore(REPORT_WORKERS)
+
+# Заголовки листов отчета (тайский + английский)
+REQUEST_HEADERS = [
+    "Date",
+    "Point ID",
+    "User ID",
+    "Activity Type",
+    "PET Bags",
+    "Aluminum Bags",
+    "Glass Bags",
+    "Other Bags",
+    "Total Quantity"
+]
+
+SHIPMENT_HEADERS = [
+    "Date",
+    "Point ID",
+    "Driver ID",
+    "Total Payment",
+    # По три колонки на материал в порядке реестра
+    *(header for material in MATERIALS
+      for header in (f"{material.label} kg", f"{material.label} Price", f"{material.label} Total"))
+]
+
+COMBINED_HEADERS = [
+    "Type",
+    "Date",
+    "Point ID",
+    "User ID",
+    # Для материалов, которые есть в заявках, в первой колонке — мешки заявки или кг отгрузки
+    *(header for material in MATERIALS
+      for header in (
+          f"{material.label} (Bags/kg)" if material.request_bag else f"{material.label} kg",
+          f"{material.label} Price",
+          f"{material.label} Total")),
+    # Итоги
+    "Total Amount",
+    "Activity Type (for requests)"
+]
+
+
+def request_row(req):
+    """Строка листа заявок"""
+    return [
+        req.timestamp.strftime('%Y-%m-%d %H:%M'),
+        req.point_id,
+        req.user_id,
+        req.activity,
+        req.pet_bag or 0,
+        req.aluminum_bag or 0,
+        req.glass_bag or 0,
+        req.other or 0,
+        (req.pet_bag or 0) + (req.aluminum_bag or 0) +
+        (req.glass_bag or 0) + (req.other or 0)
+    ]
+
+
+def shipment_row(ship):
+    """Строка листа отгрузок"""
+    return [
+        ship.timestamp.strftime('%Y-%m-%d %H:%M'),
+        ship.point_id,
+        ship.user_id,
+        ship.total_pay,
+        *(value for material in MATERIALS for value in ship.line(material.key))
+    ]
+
+
+def combined_row(kind, obj):
+    """Строка общего листа для заявки или отгрузки"""
+    if kind == "request":
+        row = [
+            "Request",
+            obj.timestamp.strftime('%Y-%m-%d %H:%M'),
+            obj.point_id,
+            obj.user_id,
+        ]
+        for material in MATERIALS:
+            bags = (getattr(obj, material.request_bag) or 0) if material.request_bag else ""
+            row += [bags, "", ""]
+        return [
+            *row,
+            "",  # Total Amount
+            obj.activity  # Activity Type
+        ]
+    # Колонки отгрузки совпадают с листом отгрузок, кроме позиции итоговой суммы
+    row = shipment_row(obj)
+    return ["Shipment", *row[:3], *row[4:], obj.total_pay, ""]
+
+
+def _render_batch(sheets, items):
+    """Дописывает пачку активности сразу в профильный и общий листы. Выполняется в пуле потоков"""
+    for kind, obj in items:
+        if kind == "request":
+            title, row = "Requests", request_row(obj)
+        else:
+            title, row = "Shipments", shipment_row(obj)
+        # Лист может отсутствовать, если запись появилась уже после проверки наличия данных
+        if title in sheets:
+            sheets[title].append(row)
+        sheets["All Data"].append(combined_row(kind, obj))
+
+
+async def write_log_report(filename, date_from=None, date_to=None):
+    """
+    Формирует Excel-отчет с тремя листами: заявки, отгрузки и объединенные данные.
+    Период [date_from, date_to) необязателен; месяцы вне периода не читаются.
+    Каждая таблица читается из БД один раз единым потоком активности,
+    и каждая запись сразу пишется и в свой лист, и в общий.
+    Пачки строк передаются в пул потоков, где пишутся в write-only книгу,
+    поэтому event loop не блокируется, а память не зависит от объема истории.
+    Возвращает False, если данных для отчета нет.
+    """
+    has_requests, has_shipments = await get_activity_presence()
+    if not has_requests and not has_shipments:
+        return False
+
+    async with _report_slots:
+        loop = asyncio.get_running_loop()
+        wb = Workbook(write_only=True)
+
+        # Листы создаем заранее, чтобы сохранить их порядок в книге
+        sheets = {}
+        for title, headers, present in (
+            ("Requests", REQUEST_HEADERS, has_requests),
+            ("Shipments", SHIPMENT_HEADERS, has_shipments),
+            ("All Data", COMBINED_HEADERS, True),
+        ):
+            if present:
+                sheets[title] = wb.create_sheet(title)
+                sheets[title].append(headers)
+
+        batch = []
+        async for item in stream_activity(date_from, date_to):
+            batch.append(item)
+            if len(batch) >= RENDER_BATCH_SIZE:
+                await loop.run_in_executor(_report_pool, _render_batch, sheets, batch)
+                batch = []
+        if batch:
+            await loop.run_in_executor(_report_pool, _render_batch, sheets, batch)
+
+        await loop.run_in_executor(_report_pool, wb.save, filename)
+        return True
@@ -16,34 +16,13 @@ class Help(StatesGroup):
     request = State()
 class ShipmentStates(StatesGroup):
     point_id = State()
-    # Основные материалы
-    pet_kg = State()
-    pet_price = State()
-    paper_kg = State()
-    paper_price = State()
-    alum_kg = State()
-    alum_price = State()
-    glass_kg = State()
-    glass_price = State()
-    small_beer_box_kg = State()
-    small_beer_box_price = State()
-    large_beer_box_kg = State()
-    large_beer_box_price = State()
-    mixed_beer_box_kg = State()
-    mixed_beer_box_price = State()
-    # Другие материалы
-    oil_kg = State()
-    oil_price = State()
-    colored_plastic_kg = State()
-    colored_plastic_price = State()
-    iron_kg = State()
-    iron_price = State()
-    plastic_bag_kg = State()
-    plastic_bag_price = State()
-    mix_kg = State()
-    mix_price = State()
-    other_kg = State()
-    other_price = State()
+    # Ввод по материалу, выбранному кнопкой (ключ хранится в данных FSM как 'material')
+    kg = State()
+    price = State()
+
+
+class PointHistory(StatesGroup):
+    point_id = State()
 
 
 class Reports(StatesGroup):
@@ -60,6 +39,14 @@ class CreatePoint(StatesGroup):
     address = State()
     confirmation = State()
 
+class ImportPoints(StatesGroup):
+    file = State()
+
+
+class BulkDeletePoints(StatesGroup):
+    target = State()
+    confirmation = State()
+
 class ManagePoints(StatesGroup):
     action = State()
     point_id = State()
@@ -3,14 +3,16 @@ from aiogram import Router, F, types
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
 from datetime import datetime
 
 from app.database.requests import (
-    set_user, add_request, get_user_by_tg_id, get_user_points, get_point_by_id, 
-    is_point_available, bind_point_to_user, update_bags_count
+    set_user, add_request, get_user_binding, get_point_by_id, 
+    is_point_available, bind_point_to_user
 )
+from app.database.buffer import request_buffer
 from app.states import Reg, BagFull, Help
 from app.keyboards import bags_count_keyboard, user_command, help_command, notification_keyboard
 
@@ -22,13 +24,12 @@ async def cmd_menu(message: Message):
     await message.answer("เลือกการดำเนินการ:", reply_markup=user_command())  # "Выберите действие:"
 
 @user.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, session: AsyncSession):
     # Проверяем, есть ли у пользователя привязанная точка
-    user = await get_user_by_tg_id(message.from_user.id)
+    point_id, point = await get_user_binding(message.from_user.id, session=session)
     
-    if user and user.point_id:
+    if point_id:
         # Если точка уже привязана, показываем основное меню
-        point = await get_point_by_id(user.point_id)
         if point:
             await message.answer(
                 f'คุณได้ผูกติดกับจุด {point.point_id} แล้ว กรุณาเลือกการดำเนินการ:',  # "Вы уже привязаны к точке {point.point_id}. Выберите действие:"
@@ -41,12 +42,13 @@ async def cmd_start(message: Message, state: FSMContext):
             )
     else:
         # Если точки нет, начинаем процесс регистрации
-        await set_user(message.from_user.id)
+        await set_user(message.from_user.id, session=session)
+        await session.commit()  # До ответа в Telegram
         await message.answer('ยินดีต้อนรับสู่บอท! กรุณากรอกหมายเลขจุด:', reply_markup=None)  # "Добро пожаловать в бот! Пожалуйста, введите номер точки:"
         await state.set_state(Reg.point)
 
 @user.message(Reg.point)
-async def process_point(message: Message, state: FSMContext):
+async def process_point(message: Message, state: FSMContext, session: AsyncSession):
     point_id = message.text.strip()
     
     if not point_id.isdigit():
@@ -58,7 +60,7 @@ async def process_point(message: Message, state: FSMContext):
         await message.answer('ไม่พบจุดที่มีหมายเลขนี้ กรุณาตรวจสอบและลองอีกครั้ง')  # "Точка с таким номером не найдена. Пожалуйста, проверьте номер и попробуйте снова."
         return
         
-    if not await is_point_available(point.point_id):
+    if not await is_point_available(point.point_id, session=session):
         await message.answer(
             'จุดนี้ถูกผูกติดกับผู้ใช้อื่นแล้ว กรุณาติดต่อผู้ดูแลระบบ',  # "Эта точка уже привязана к другому пользователю. Пожалуйста, обратитесь к администратору."
             reply_markup=help_command()
@@ -66,25 +68,33 @@ async def process_point(message: Message, state: FSMContext):
         return
         
     try:
-        await bind_point_to_user(point.point_id, message.from_user.id)
-        await message.answer(
-            f'ยินดีด้วย! คุณได้ผูกติดกับจุด {point.point_id} เรียบร้อยแล้ว!',  # "Отлично, вы успешно привязаны к точке {point.point_id}!"
-            reply_markup=user_command()
-        )
+        await bind_point_to_user(point.point_id, message.from_user.id, session=session)
+        # Коммитим до ответа в Telegram: сбой отправки не должен откатить привязку
+        await session.commit()
     except ValueError as e:
+        await session.rollback()
+        await state.clear()
         await message.answer(f'ข้อผิดพลาด: {e}')  # "Ошибка: {e}"
+        return
     except Exception as e:
+        await session.rollback()
+        await state.clear()
+        print(f"Error in process_point: {e}")
         await message.answer(
             'เกิดข้อผิดพลาดที่ไม่คาดคิด กรุณาลองอีกครั้งในภายหลังหรือติดต่อผู้ดูแลระบบ'  # "Произошла непредвиденная ошибка. Пожалуйста, попробуйте позже или обратитесь к администратору."
         )
-        print(f"Error in process_point: {e}")
-    
+        return
+
     await state.clear()
+    await message.answer(
+        f'ยินดีด้วย! คุณได้ผูกติดกับจุด {point.point_id} เรียบร้อยแล้ว!',  # "Отлично, вы успешно привязаны к точке {point.point_id}!"
+        reply_markup=user_command()
+    )
 
 @user.callback_query(F.data == "bag_full")
-async def cmd_bag_full(callback: CallbackQuery, state: FSMContext):
-    points = await get_user_points(callback.from_user.id)
-    if points:
+async def cmd_bag_full(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
+    _, point = await get_user_binding(callback.from_user.id, session=session)
+    if point:
         await callback.message.answer(
             'คุณเติมถุงอลูมิเนียมแล้วกี่ถุง?',  # "Сколько мешков алюминия заполнено?"
             reply_markup=bags_count_keyboard()
@@ -144,11 +154,11 @@ async def process_other_count(message: Message, state: FSMContext):
     await state.set_state(BagFull.confirmation)
 
 @user.callback_query(BagFull.confirmation, F.data == "confirm_bags")
-async def confirm_bags(callback: CallbackQuery, state: FSMContext):
+async def confirm_bags(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
-    points = await get_user_points(callback.from_user.id)
+    _, point = await get_user_binding(callback.from_user.id, session=session)
     
-    if points:
+    if point:
         total_bags = sum([
             data.get('aluminum_count', 0),
             data.get('pet_count', 0),
@@ -156,18 +166,17 @@ async def confirm_bags(callback: CallbackQuery, state: FSMContext):
             data.get('other_count', 0)
         ])
         
-        for point in points:
-            await add_request(
-                point_id=point.point_id,
-                user_id=callback.from_user.id,  # Добавлен user_id
-                activity="bag_full",
-                pet_bag=data.get('pet_count'),
-                aluminum_bag=data.get('aluminum_count'),
-                glass_bag=data.get('glass_count'),
-                other=data.get('other_count')
-            )
-            
-            await update_bags_count(point.point_id, total_bags)
+        # Заявка и новое число мешков пишутся пакетно через буфер отложенной записи
+        request_buffer.add(
+            point_id=point.point_id,
+            user_id=callback.from_user.id,  # Добавлен user_id
+            activity="bag_full",
+            bags_count=total_bags,
+            pet_bag=data.get('pet_count'),
+            aluminum_bag=data.get('aluminum_count'),
+            glass_bag=data.get('glass_count'),
+            other=data.get('other_count')
+        )
         
         await callback.message.answer(
             "✅ ขอบคุณสำหรับข้อมูล เราจะส่งรถบรรทุกภายใน 5 วัน",  # "✅ Спасибо, информация получена, мы пришлем грузовик в течении 5 дней"
@@ -190,15 +199,18 @@ async def cancel_bags(callback: CallbackQuery, state: FSMContext):
     await state.clear()
 
 @user.callback_query(F.data == "adm_help")
-async def call_admin(callback: CallbackQuery, bot: Bot):
-    user = await get_user_by_tg_id(callback.from_user.id)
+async def call_admin(callback: CallbackQuery, bot: Bot, session: AsyncSession):
+    point_id, point = await get_user_binding(callback.from_user.id, session=session)
     
-    if user and user.point_id:
+    # Точка могла быть удалена: привязка без снимка не дает права писать заявки
+    if point:
         await add_request(
-            point_id=user.point_id,
+            point_id=point_id,
             user_id=callback.from_user.id,  # Добавлен user_id
-            activity="admin_help"
+            activity="admin_help",
+            session=session
         )
+        await session.commit()  # До обращений к Telegram
         
         admin_phone_number = "+799999999"
         ADMIN_TG_ID = 753755508
@@ -206,7 +218,7 @@ async def call_admin(callback: CallbackQuery, bot: Bot):
         admin_message = (
             f"🔔 **คำขอความช่วยเหลือจากผู้ใช้!**\n"  # "Запрос на помощь от пользователя!"
             f"👤 ผู้ใช้: @{callback.from_user.username} ({callback.from_user.id})\n"  # "Пользователь:"
-            f"📍 จุดรวบรวม ID: {user.point_id}\n"  # "Точка сбора ID:"
+            f"📍 จุดรวบรวม ID: {point_id}\n"  # "Точка сбора ID:"
             f"🕒 เวลาที่ร้องขอ: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"  # "Время запроса:"
         )
         
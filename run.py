@@ -9,9 +9,14 @@ import os
 
 from app.user import user
 from app.admin import admin
+from app.middlewares import DbSessionMiddleware
 
 
-from app.database.models import async_main
+from app.database.models import warm_pool
+from app.database.migrations import migrate
+from app.database.buffer import request_buffer
+from app.database.purge import point_purger
+from app.database.directory import directory
 
 
 async def main():
@@ -20,6 +25,7 @@ async def main():
     
     await set_commands(bot)
     dp = Dispatcher()
+    dp.update.middleware(DbSessionMiddleware())
     dp.include_routers(user, admin)
     dp.startup.register(startup)
     dp.shutdown.register(shutdown)
@@ -37,12 +43,18 @@ async def set_commands(bot: Bot):
     await bot.set_my_commands(commands)
 
 async def startup(dispatcher: Dispatcher):
-    await async_main()
+    await migrate()
+    await warm_pool()
+    await directory.load()
+    request_buffer.start()
+    point_purger.start()
     print('Starting up...')
 
 
 async def shutdown(dispatcher: Dispatcher):
     print('Shutting down...')
+    await request_buffer.stop()
+    await point_purger.stop()
 
 
 if __name__ == '__main__':